@@ -0,0 +1,401 @@
+"""Differential equivalence harness for the vectorized scoring and grouping code.
+
+Runs each row by row reference implementation and its vectorized counterpart
+on large randomized frames and on small adversarial frames (NaN responses,
+empty strings, the WAI `qq_wai_1` missing branch, numeric dtypes, totals
+outside every category, non-string column labels, ...). Outputs are diffed
+cell by cell, including the Python type of every cell, and the speedup of the
+vectorized path is recorded.
+If the reference raises, the vectorized path must raise the same exception.
+
+The undecorated vectorized functions are compared, so a case the fast path
+hands back to the reference is reported as "fell back" rather than a match.
+
+Usage:
+    python benchmarks/bench_equivalence.py [--rows N] [--seed S]
+
+Exits with a non-zero status if any output differs.
+"""
+
+import argparse
+import fnmatch
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from data2redcap.transform import grouping, survey
+from data2redcap.transform.columns import ColumnIndex
+from data2redcap.transform.fallback import ReferenceFallback
+from data2redcap.transform.transform import transform_data_source
+
+SURVEY_SCORING = {
+    "pss": {
+        "question_prefix": "qq_pss",
+        "scoring_method": "normal",
+        "category": {"1": [0, 13], "2": [14, 26], "3": [27, 40]},
+    },
+    "wai": {
+        "question_prefix": "qq_wai",
+        "scoring_method": "wai",
+        "category": {"1": [0, 7], "2": [7.5, 11], "3": [11.5, 14], "4": [14.5, 49]},
+    },
+    "eq5d": {"question_prefix": "qq_eq5d", "scoring_method": "eq5d"},
+}
+SCORING_PAIRS = {
+    "normal": (survey.score_normal_survey, survey.score_normal_survey_vectorized),
+    "wai": (survey.score_wai_survey, survey.score_wai_survey_vectorized),
+    "eq5d": (survey.score_eq5d_survey, survey.score_eq5d_survey_vectorized),
+}
+GROUPING_PAIRS = {
+    name: (getattr(grouping, name), getattr(grouping, f"{name}_vectorized"))
+    for name in [
+        "_set_tbi_status",
+        "_set_covid_status",
+        "_set_suspected_covid19_status",
+        "_set_study_group",
+        "_set_covid_symptom_status",
+        "_set_tbi_symptom_status",
+    ]
+}
+
+
+def random_frame(rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Creates a survey frame shaped like a translated year 1 questionnaire.
+
+    Arguments:
+        rows: Number of participants.
+        rng: Random number generator.
+
+    Returns:
+        pd.DataFrame: Frame of string responses with missing values.
+    """
+
+    def responses(choices: list, missing: float = 0.05) -> np.ndarray:
+        values = rng.choice(np.array(choices, dtype=object), size=rows)
+        values[rng.random(rows) < missing] = np.nan
+        return values
+
+    columns = {"participant_id": [f"P{i:06d}" for i in range(rows)]}
+    for question in range(1, 11):
+        columns[f"qq_pss_{question}"] = responses(["0", "1", "2", "3", "4"], 0.01)
+    columns["qq_wai_1"] = responses(["1", "2", "3"], 0.1)
+    for question in range(2, 11):
+        choices = (
+            ["0", "1", "2", "3", "4"] if question >= 8 else ["1", "2", "3", "4", "5"]
+        )
+        columns[f"qq_wai_{question}"] = responses(choices, 0)
+    for question in survey.EQ5D_SCORING_DICT:
+        columns[question] = responses(["1", "1", "2", "3", "4", "5"], 0)
+    columns["qq_tbi_history___10"] = responses(["0", "1"])
+    columns["qq_covid_number"] = responses(["1", "2", "11"])
+    columns["qq_mtbi_status"] = responses(["1", "2"], 0)
+    columns["qq_covid19_status"] = responses(["1", "2"], 0)
+    for episode in range(1, 13):
+        columns[f"qq_covid_{episode}_test_results"] = responses(["0", "1"], 0.5)
+        columns[f"qq_covid_{episode}_duration_fatigue"] = responses(
+            [str(code) for code in range(1, 8)], 0.6
+        )
+    for episode in range(1, 4):
+        columns[f"qq_tbi_{episode}_duration_headache"] = responses(
+            [str(code) for code in range(1, 8)], 0.6
+        )
+    return pd.DataFrame(columns)
+
+
+def adversarial_frames(rng: np.random.Generator) -> dict:
+    """Creates small frames that exercise the edge cases of the reference code.
+
+    Arguments:
+        rng: Random number generator.
+
+    Returns:
+        dict: Case name to (frame, survey scoring config).
+    """
+    base = random_frame(40, rng)
+    cases = {}
+
+    def case(name: str, frame: pd.DataFrame, scoring: dict = SURVEY_SCORING) -> None:
+        cases[name] = (frame, scoring)
+
+    case("empty_frame", base.iloc[0:0].copy())
+    nan_responses = base.copy()
+    nan_responses.loc[::3, "qq_pss_4"] = np.nan
+    nan_responses.loc[::4, "qq_covid_1_test_results"] = np.nan
+    case("nan_responses", nan_responses)
+    empty_strings = base.copy()
+    empty_strings.loc[5, ["qq_pss_2", "qq_wai_5", "qq_covid_3_duration_fatigue"]] = ""
+    case("empty_strings", empty_strings)
+    wai_missing = base.copy()
+    wai_missing["qq_wai_1"] = np.nan
+    case("wai_all_work_type_missing", wai_missing)
+    wai_none = base.copy()
+    wai_none.loc[3, "qq_wai_1"] = None
+    case("wai_work_type_none", wai_none)
+    wai_float_nan = base.copy()
+    wai_float_nan["qq_wai_1"] = pd.to_numeric(wai_float_nan["qq_wai_1"])
+    case("wai_work_type_numeric", wai_float_nan)
+    wai_missing_other = base.copy()
+    wai_missing_other.loc[wai_missing_other["qq_wai_1"].isna(), "qq_wai_6"] = "bad"
+    case("wai_missing_rows_skip_conversion", wai_missing_other)
+    item_7 = base.copy()
+    item_7.loc[7, ["qq_wai_8", "qq_wai_9", "qq_wai_10"]] = "5"
+    case("wai_item_7_out_of_range", item_7)
+    ones = base.copy()
+    ones[list(survey.EQ5D_SCORING_DICT)] = "1"
+    case("eq5d_all_ones", ones)
+    eq5d_missing = base.copy()
+    eq5d_missing.loc[2, "qq_eq5d_selfcare"] = np.nan
+    case("eq5d_missing_response", eq5d_missing)
+    whitespace = base.copy()
+    whitespace.loc[:, "qq_pss_1"] = " 3 "
+    whitespace.loc[:, "qq_wai_3"] = " 2"
+    case("whitespace_numbers", whitespace)
+    numeric = base.apply(pd.to_numeric, errors="ignore")
+    case("numeric_columns", numeric)
+    gap_scoring = {**SURVEY_SCORING, "pss": {**SURVEY_SCORING["pss"]}}
+    gap_scoring["pss"]["category"] = {"1": [0, 13], "3": [27, 40]}
+    case("total_outside_categories", base.copy(), gap_scoring)
+    overlap_scoring = {**SURVEY_SCORING, "wai": {**SURVEY_SCORING["wai"]}}
+    overlap_scoring["wai"]["category"] = {"1": [0, 12], "2": [10, 49]}
+    case("wai_overlapping_categories", base.copy(), overlap_scoring)
+    case("no_categories", base.copy(), {**SURVEY_SCORING, "pss": {"category": {}}})
+    return cases
+
+
+def _same_cell(expected, actual) -> bool:
+    if type(expected) is not type(actual):
+        return False
+    if isinstance(expected, float) and math.isnan(expected):
+        return math.isnan(actual)
+    return bool(expected == actual)
+
+
+def diff_frames(expected: pd.DataFrame, actual: pd.DataFrame) -> list[str]:
+    """Diffs two frames cell by cell, including dtypes and cell types.
+
+    Arguments:
+        expected: Reference output.
+        actual: Vectorized output.
+
+    Returns:
+        list[str]: Description of every difference found.
+    """
+    if list(expected.columns) != list(actual.columns):
+        return [f"columns {list(expected.columns)} != {list(actual.columns)}"]
+    diffs = []
+    for column in expected.columns:
+        if expected[column].dtype != actual[column].dtype:
+            diffs.append(
+                f"{column}: dtype {expected[column].dtype} != {actual[column].dtype}"
+            )
+        for row, (a, b) in enumerate(
+            zip(expected[column].tolist(), actual[column].tolist())
+        ):
+            if not _same_cell(a, b):
+                diffs.append(f"{column}[{row}]: {a!r} != {b!r}")
+    return diffs
+
+
+def _run(func, df: pd.DataFrame, kwargs: dict) -> tuple:
+    frame = df.copy()
+    start = time.perf_counter()
+    try:
+        result = func(df=frame, **kwargs)
+        error = None
+    except Exception as exception:  # the reference's errors are part of its behavior
+        result, error = None, exception
+    return result, error, time.perf_counter() - start
+
+
+def compare(reference, vectorized, df: pd.DataFrame, kwargs: dict) -> dict:
+    """Runs both implementations on copies of a frame and diffs the results.
+
+    Arguments:
+        reference: Row by row implementation.
+        vectorized: Vectorized implementation, run without its reference fallback.
+        df: Input frame.
+        kwargs: Keyword arguments other than `df`.
+
+    Returns:
+        dict: Outcome, differences and timings.
+    """
+    expected, expected_error, reference_time = _run(reference, df, kwargs)
+    actual, actual_error, vectorized_time = _run(vectorized.__wrapped__, df, kwargs)
+    if isinstance(actual_error, ReferenceFallback):
+        outcome = "fell back"
+        diffs = []
+    elif expected_error or actual_error:
+        same = type(expected_error) is type(actual_error) and str(
+            expected_error
+        ) == str(actual_error)
+        outcome = f"raised {type(expected_error).__name__}"
+        diffs = (
+            []
+            if same
+            else [f"reference raised {expected_error!r}, vectorized {actual_error!r}"]
+        )
+    else:
+        outcome = "match"
+        diffs = diff_frames(expected, actual)
+    return {
+        "outcome": outcome if not diffs else "MISMATCH",
+        "diffs": diffs,
+        "reference_time": reference_time,
+        "vectorized_time": vectorized_time,
+    }
+
+
+def run_cases(cases: dict) -> list[tuple]:
+    """Compares every scoring and grouping pair on every case.
+
+    Arguments:
+        cases: Case name to (frame, survey scoring config).
+
+    Returns:
+        list[tuple]: (function, case, rows, comparison) per run.
+    """
+    results = []
+    for case_name, (df, survey_scoring) in cases.items():
+        for name, score_config in survey_scoring.items():
+            method = score_config.get("scoring_method", "normal")
+            prefix = score_config.get("question_prefix", f"qq_{name}")
+            kwargs = {
+                "survey": name,
+                "survey_question_list": fnmatch.filter(list(df.columns), f"{prefix}*"),
+                "prefix": prefix,
+                "survey_scoring": survey_scoring,
+            }
+            reference, vectorized = SCORING_PAIRS[method]
+            results.append(
+                (
+                    reference.__name__,
+                    case_name,
+                    len(df),
+                    compare(reference, vectorized, df, kwargs),
+                )
+            )
+        for name, (reference, vectorized) in GROUPING_PAIRS.items():
+            results.append(
+                (name, case_name, len(df), compare(reference, vectorized, df, {}))
+            )
+    return results
+
+
+def compare_column_index(df: pd.DataFrame, surveys: int = 30) -> tuple:
+    """Compares `ColumnIndex.match` with `fnmatch.filter` on a wide frame.
+
+    Arguments:
+        df: Frame whose columns are widened with extra instruments.
+        surveys: Number of extra instruments of 60 questions each.
+
+    Returns:
+        tuple: (matches, column count, fnmatch seconds, index seconds)
+    """
+    columns = list(df.columns) + [
+        f"qq_instrument{survey}_{question}"
+        for survey in range(surveys)
+        for question in range(1, 61)
+    ]
+    patterns = [f"qq_instrument{survey}*" for survey in range(surveys)] + [
+        "qq_pss*",
+        "qq_wai*",
+        "qq_eq5d*",
+        "qq_covid_?_test_results",
+        "qq_covid_??_test_results",
+        "qq_covid_?_duration_*",
+        "qq_covid_??_duration_*",
+        "qq_tbi_?_duration_*",
+        "qq_tbi_??_duration_*",
+    ]
+    start = time.perf_counter()
+    expected = [fnmatch.filter(columns, pattern) for pattern in patterns]
+    fnmatch_time = time.perf_counter() - start
+    start = time.perf_counter()
+    column_index = ColumnIndex(columns)
+    actual = [column_index.match(pattern) for pattern in patterns]
+    index_time = time.perf_counter() - start
+    return expected == actual, len(columns), fnmatch_time, index_time
+
+
+def compare_non_string_labels(rng: np.random.Generator) -> bool:
+    """Checks frames with non-string column labels, e.g. numeric xlsx headers.
+
+    The frame must pass through a data source without scoring or grouping
+    unchanged in both modes, and the column index must match string labels
+    as `fnmatch.filter` does.
+
+    Arguments:
+        rng: Random number generator.
+
+    Returns:
+        bool: Whether every check passed.
+    """
+    df = random_frame(20, rng)
+    df[2023] = "1"
+    df[pd.Timestamp("2023-01-01")] = "2"
+    config = {"config": {"grouping": False}}
+    for reference in [False, True]:
+        try:
+            transformed_df = transform_data_source(
+                config, df.copy(), reference=reference
+            )
+        except Exception as exception:
+            print(f"    reference={reference} raised {exception!r}")
+            return False
+        if diff_frames(df, transformed_df):
+            return False
+    string_labels = [column for column in df.columns if isinstance(column, str)]
+    column_index = ColumnIndex(df.columns)
+    return all(
+        column_index.match(pattern) == fnmatch.filter(string_labels, pattern)
+        for pattern in ["qq_pss*", "qq_covid_?_test_results", "participant_id"]
+    ) and column_index.match("2023") == [2023]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    cases = {"random": (random_frame(args.rows, rng), SURVEY_SCORING)}
+    cases.update(adversarial_frames(rng))
+    mismatches = 0
+    fallbacks = 0
+    print(
+        f"{'function':<32} {'case':<34} {'rows':>7} {'outcome':<22} "
+        f"{'reference':>10} {'vectorized':>10} {'speedup':>8}"
+    )
+    for function, case_name, rows, result in run_cases(cases):
+        speedup = result["reference_time"] / max(result["vectorized_time"], 1e-9)
+        print(
+            f"{function:<32} {case_name:<34} {rows:>7} {result['outcome']:<22} "
+            f"{result['reference_time'] * 1000:>8.1f}ms "
+            f"{result['vectorized_time'] * 1000:>8.1f}ms {speedup:>7.1f}x"
+        )
+        for diff in result["diffs"][:10]:
+            print(f"    {diff}")
+        mismatches += bool(result["diffs"])
+        fallbacks += result["outcome"] == "fell back"
+    same, column_count, fnmatch_time, index_time = compare_column_index(
+        cases["random"][0]
+    )
+    print(
+        f"column index vs fnmatch on {column_count} columns: "
+        f"{'match' if same else 'MISMATCH'}, fnmatch {fnmatch_time * 1000:.1f}ms, "
+        f"index {index_time * 1000:.1f}ms ({fnmatch_time / index_time:.1f}x)"
+    )
+    mismatches += not same
+    non_string_labels = compare_non_string_labels(rng)
+    print(f"non-string column labels: {'match' if non_string_labels else 'MISMATCH'}")
+    mismatches += not non_string_labels
+    print(f"{fallbacks} comparisons fell back to the reference implementation")
+    if mismatches:
+        raise SystemExit(f"{mismatches} comparisons differ")
+
+
+if __name__ == "__main__":
+    main()
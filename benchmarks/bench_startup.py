@@ -0,0 +1,58 @@
+"""Measures d2r startup cost.
+
+Times `d2r --help` and, when a config path is given, `d2r validate <config>`
+in fresh interpreters, with a bare `import pandas` as the reference cost of
+loading the processing stack.
+
+Usage:
+    python benchmarks/bench_startup.py [path/to/config.json] [--repeat N]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+def _time_command(args: list[str], repeat: int) -> tuple[float, float]:
+    """Runs a command in a fresh interpreter and times it.
+
+    Arguments:
+        args: Arguments passed to the python interpreter.
+        repeat: Number of timed runs.
+
+    Returns:
+        tuple: Median and minimum wall time in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *args],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("config_path", nargs="?")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = {
+        "python (baseline)": ["-c", "pass"],
+        "import pandas": ["-c", "import pandas"],
+        "d2r --help": ["-m", "data2redcap", "--help"],
+    }
+    if args.config_path:
+        cases["d2r validate"] = ["-m", "data2redcap", "validate", args.config_path]
+    for name, case_args in cases.items():
+        median, best = _time_command(case_args, args.repeat)
+        print(f"{name:<20} median {median * 1000:8.1f} ms   min {best * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+import csv
+import glob
+import json
+import logging
+import os
+from typing import Union
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FILE_STRUCTURE_KEYS = [
+    "file_parent_folder_path",
+    "data_sources_folder",
+    "data_backup_folder",
+    "final_export_location",
+    "data_key_path",
+]
+REQUIRED_SOURCE_KEYS = ["type", "file_name", "union", "config"]
+SOURCE_TYPES = ["Qualtrics", "Spreadsheet"]
+REQUIRED_SCORING_KEYS = ["question_prefix", "scoring_method"]
+SCORING_METHODS = ["normal", "wai", "eq5d"]
+# translated headers that special scoring and grouping logic read directly
+EQ5D_HEADERS = [
+    "qq_eq5d_mobility",
+    "qq_eq5d_selfcare",
+    "qq_eq5d_usual_activities",
+    "qq_eq5d_pain_discomfort",
+    "qq_eq5d_anxiety_depression",
+]
+WAI_HEADERS = ["qq_wai_1"]
+GROUPING_HEADERS = ["qq_tbi_history___10", "qq_covid_number"]
+
+
+def load_config(config_path: str) -> tuple[dict, dict]:
+    """Loads config file into dictionaries.
+
+    Arguments:
+        config_path: String path to configuration file.
+
+    Returns:
+        process_config: Dictionary containing configuration for overall data processing.
+        source_config: Dictionary containing configuration for all individual data sources.
+    """
+    with open(config_path) as file:
+        config = json.load(file)
+    process_config = config["process_config"]
+    source_config = config["data_sources"]
+    return process_config, source_config
+
+
+def _create_file_path(*args: list[str]) -> str:
+    """Combines all arguments into a single path string.
+
+    Arguments:
+        args: List of strings.
+
+    Returns:
+        str: Path made of joined string arguments.
+    """
+    return "/".join(args)
+
+
+def resolve_data_files(
+    file_name: Union[str, list[str]], file_structure: dict
+) -> list[str]:
+    """Resolves a data source file name, glob pattern, or list of either into file names.
+
+    Arguments:
+        file_name: Name, glob pattern, or list of names/patterns of data files.
+        file_structure: Dictionary containing configuration for file locations.
+
+    Returns:
+        file_names: Sorted list of matching file names within the data sources folder.
+    """
+    patterns = [file_name] if isinstance(file_name, str) else list(file_name)
+    source_folder = _create_file_path(
+        file_structure["file_parent_folder_path"],
+        file_structure["data_sources_folder"],
+    )
+    file_names = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(
+                os.path.relpath(path, source_folder)
+                for path in glob.glob(_create_file_path(source_folder, pattern))
+            )
+            if not matches:
+                raise FileNotFoundError(
+                    f"No data files in {source_folder} match pattern `{pattern}`"
+                )
+        else:
+            # plain names are passed through so a missing file still errors on load
+            matches = [pattern]
+        for match in matches:
+            if match not in file_names:
+                file_names.append(match)
+    return file_names
+
+
+def create_final_data_dictionary(config: dict) -> dict:
+    """Generates final data dictionary with looping questions.
+
+    Arguments:
+        config: Dictionary containing configuration for data sources.
+
+    Returns:
+        data_dict: Final data dictionary for data sources.
+    """
+    data_dict = config["config"].get("data_dictionary")
+    if data_dict is None:
+        logger.info("No data dictionary provided in data source config")
+        return data_dict
+    if (
+        config["config"].get("looping_questions") is None
+        or len(config["config"].get("looping_questions")) == 0
+    ):
+        logger.info("No looping questions present in data source config")
+        return data_dict
+    else:
+        looping_dict = config["config"].get("looping_questions")
+        new_dict = {}
+        for prefix, number in looping_dict.items():
+            for k, v in data_dict.items():
+                if k.startswith("1_") and (
+                    "vaccine" not in v and "vaccination" not in v
+                ):
+                    new_dict.update({k: v})
+                    if v.startswith(prefix):
+                        for i in range(number):
+                            if i != 0:
+                                key = str(i + 1) + "_" + k.split("_", 1)[1]
+                                value = (
+                                    v.split("1", 1)[0] + str(i + 1) + v.split("1", 1)[1]
+                                )
+                                new_dict.update({key: value})
+                else:
+                    new_dict.update({k: v})
+        logger.info("data dictionary successfully expanded for looping questions")
+        return new_dict
+
+
+def get_participant_column(config: dict) -> str:
+    """Finds the raw column that is translated to `participant_id` for a data source.
+
+    Arguments:
+        config: Dictionary containing configuration for data source.
+
+    Returns:
+        str: Name of the participant id column before header translation.
+    """
+    data_dict = config["config"].get("data_dictionary") or {}
+    for header, redcap_header in data_dict.items():
+        if redcap_header == "participant_id":
+            return header
+    return "participant_id"
+
+
+def read_file_headers(file_path: str) -> list[str]:
+    """Reads only the column headers of a data file.
+
+    Arguments:
+        file_path: Path to a `.csv` or `.xlsx` data file.
+
+    Returns:
+        headers: List of column headers.
+    """
+    if file_path.endswith(".csv"):
+        with open(file_path, newline="", encoding="utf-8-sig") as file:
+            return next(csv.reader(file), [])
+    elif file_path.endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_path, read_only=True)
+        try:
+            first_row = next(workbook.active.iter_rows(max_row=1, values_only=True), ())
+        finally:
+            workbook.close()
+        return [str(header) for header in first_row if header is not None]
+    raise ImportError("File type not supported. Must be either `.csv` or `.xlsx`")
+
+
+def _validate_source(data_source: str, config: dict, file_structure: dict) -> list[str]:
+    """Checks a single data source config against the headers of its files.
+
+    Arguments:
+        data_source: Name of the data source.
+        config: Dictionary containing configuration for data source.
+        file_structure: Dictionary containing configuration for file locations.
+
+    Returns:
+        errors: List of problems found.
+    """
+    missing_keys = [key for key in REQUIRED_SOURCE_KEYS if key not in config]
+    if missing_keys:
+        return [f"{data_source}: missing keys {missing_keys}"]
+    if not config["file_name"]:
+        return []
+    errors = []
+    if config["type"] not in SOURCE_TYPES:
+        errors.append(f"{data_source}: type must be one of {SOURCE_TYPES}")
+    survey_scoring = {}
+    for survey, score_config in (config["config"].get("survey_scoring") or {}).items():
+        missing_keys = [key for key in REQUIRED_SCORING_KEYS if key not in score_config]
+        if missing_keys:
+            errors.append(f"{data_source}: survey {survey} missing keys {missing_keys}")
+        elif score_config["scoring_method"] not in SCORING_METHODS:
+            errors.append(
+                f"{data_source}: survey {survey} scoring_method must be one of "
+                f"{SCORING_METHODS}"
+            )
+        else:
+            survey_scoring[survey] = score_config
+    try:
+        file_names = resolve_data_files(config["file_name"], file_structure)
+    except FileNotFoundError as error:
+        return errors + [f"{data_source}: {error}"]
+    raw_required = [get_participant_column(config)]
+    if config["type"] == "Qualtrics":
+        raw_required.append("Progress")
+    if config.get("deduplicate_on"):
+        raw_required.append(config["deduplicate_on"])
+    source_config = config["config"]
+    data_dict = None
+    if not config.get("clean"):
+        data_dict = create_final_data_dictionary(config)
+    for file_name in file_names:
+        file_path = _create_file_path(
+            file_structure["file_parent_folder_path"],
+            file_structure["data_sources_folder"],
+            file_name,
+        )
+        if not os.path.isfile(file_path):
+            errors.append(f"{data_source}: file {file_path} does not exist")
+            continue
+        try:
+            headers = read_file_headers(file_path)
+        except ImportError as error:
+            errors.append(f"{data_source}: {file_name}: {error}")
+            continue
+        missing = [header for header in raw_required if header not in headers]
+        if data_dict is None:
+            translated = set(headers)
+        else:
+            translated = {
+                data_dict[header] for header in headers if header in data_dict
+            }
+        if not config.get("clean"):
+            # surveys with config errors are reported above
+            for survey, score_config in survey_scoring.items():
+                prefix = score_config["question_prefix"]
+                if not any(header.startswith(prefix) for header in translated):
+                    missing.append(f"{prefix}* ({survey})")
+                if score_config["scoring_method"] == "eq5d":
+                    missing += [h for h in EQ5D_HEADERS if h not in translated]
+                elif score_config["scoring_method"] == "wai":
+                    missing += [h for h in WAI_HEADERS if h not in translated]
+            if source_config.get("grouping"):
+                missing += [h for h in GROUPING_HEADERS if h not in translated]
+        if missing:
+            errors.append(f"{data_source}: {file_name} is missing columns {missing}")
+    return errors
+
+
+def validate_config(config_path: str) -> list[str]:
+    """Validates a config file, its file paths, and the columns of its data files.
+
+    Only file headers are read, so this is cheap enough to run before dispatching
+    a full processing run.
+
+    Arguments:
+        config_path: String path to configuration file.
+
+    Returns:
+        errors: List of problems found. Empty if the config is valid.
+    """
+    try:
+        process_config, source_config = load_config(config_path=config_path)
+    except (OSError, ValueError, KeyError) as error:
+        return [f"Could not load config: {error!r}"]
+    file_structure = process_config.get("file_structure", {})
+    errors = [
+        f"file_structure: missing key `{key}`"
+        for key in REQUIRED_FILE_STRUCTURE_KEYS
+        if key not in file_structure
+    ]
+    if errors:
+        return errors
+    for folder_key in [
+        "data_sources_folder",
+        "data_backup_folder",
+        "final_export_location",
+    ]:
+        folder_path = _create_file_path(
+            file_structure["file_parent_folder_path"], file_structure[folder_key]
+        )
+        if not os.path.isdir(folder_path):
+            errors.append(f"file_structure: folder {folder_path} does not exist")
+    if not os.path.isfile(file_structure["data_key_path"]):
+        errors.append(
+            f"file_structure: data key {file_structure['data_key_path']} does not exist"
+        )
+    for data_source, config in source_config.items():
+        errors += _validate_source(data_source, config, file_structure)
+    return errors
@@ -1,35 +1,85 @@
 import logging
+from typing import Optional
 
-from typer import Argument, Typer
+from typer import Argument, BadParameter, Exit, Option, Typer
 
-from data2redcap.transform.transform import transform_all_data_sources
-from data2redcap.utils import create_final_redcap_format, export_file, load_config
+from data2redcap.config import load_config, validate_config
 
 logger = logging.getLogger(__name__)
 
 
-def main(config_path: str) -> None:
+def main(
+    config_path: str,
+    sample: Optional[int] = None,
+    participants: Optional[list[str]] = None,
+    reference: bool = False,
+    export_format: str = "wide",
+) -> None:
     """Main function for data2redcap. Loads config, transforms all data, and creates export.
 
+    If `sample` or `participants` is given, the pipeline runs as a preview on
+    that subset only: the export goes to the preview location and source files
+    are not moved to the backup folder.
+
     Arguments:
         config_path: String path to configuration file.
+        sample: Optional number of participants from the data key to preview.
+        participants: Optional list of participant ids to preview.
+        reference: Use the row by row reference scoring and grouping implementations.
+        export_format: "wide" for the transposed layout or "long" for
+            (record, field_name, value) rows.
     """
+    # pandas and the transform modules are only imported once processing starts
+    from data2redcap.transform.transform import transform_all_data_sources
+    from data2redcap.utils import (
+        create_final_redcap_format,
+        create_long_redcap_format,
+        export_file,
+        sample_participants,
+    )
+
     logger.info("Starting data processing.")
     # loads config into dictionary
     process_config, source_config = load_config(config_path=config_path)
     logger.info("Loaded config.")
+    if sample is not None:
+        participants = sample_participants(
+            process_config["file_structure"]["data_key_path"], sample
+        )
+    preview = participants is not None
+    if preview:
+        logger.info(f"Preview run for {len(participants)} participants.")
     # performs all data transformations
     df_dict = transform_all_data_sources(
-        process_config=process_config, source_config=source_config
+        process_config=process_config,
+        source_config=source_config,
+        participants=participants,
+        reference=reference,
     )
     logger.info("Transformed all data sources.")
     # create final redap format df
-    export_df = create_final_redcap_format(
-        df_dict=df_dict, process_config=process_config
-    )
+    if export_format == "long":
+        export_df = create_long_redcap_format(
+            df_dict=df_dict,
+            process_config=process_config,
+            participants=participants,
+            source_config=source_config,
+        )
+    else:
+        export_df = create_final_redcap_format(
+            df_dict=df_dict,
+            process_config=process_config,
+            participants=participants,
+            source_config=source_config,
+        )
     logger.info("Created final redcap format.")
     # export with today's date
-    export_file(export_df, process_config["file_structure"])
+    export_file(
+        export_df,
+        process_config["file_structure"],
+        preview=preview,
+        long_format=export_format == "long",
+    )
     logger.info("Exported final redcap import.")
 
 
@@ -37,13 +87,64 @@ app = Typer()
 
 
 config_path_arg = Argument(..., help="Path to configuration file for data processing")
+sample_opt = Option(
+    None, "--sample", help="Preview the pipeline on the first N participants"
+)
+participants_opt = Option(
+    None,
+    "--participants",
+    help="Preview the pipeline on a comma separated list of participant ids",
+)
+export_format_opt = Option(
+    "wide",
+    "--export-format",
+    help="`wide` for the transposed layout or `long` for (record, field_name, value) rows",
+)
+reference_opt = Option(
+    False,
+    "--reference",
+    help="Use the row by row reference scoring and grouping implementations",
+)
 
 
 @app.command()
 def run(
     config_path: str = config_path_arg,
+    sample: Optional[int] = sample_opt,
+    participants: Optional[str] = participants_opt,
+    reference: bool = reference_opt,
+    export_format: str = export_format_opt,
+):
+    """Transforms all data sources and exports the redcap import file."""
+    if export_format not in ["wide", "long"]:
+        raise BadParameter("must be `wide` or `long`", param_hint="--export-format")
+    if sample is not None and participants is not None:
+        raise BadParameter(
+            "cannot be combined with --participants", param_hint="--sample"
+        )
+    participant_list = None
+    if participants:
+        participant_list = [p.strip() for p in participants.split(",") if p.strip()]
+    main(
+        config_path=config_path,
+        sample=sample,
+        participants=participant_list,
+        reference=reference,
+        export_format=export_format,
+    )
+
+
+@app.command()
+def validate(
+    config_path: str = config_path_arg,
 ):
-    main(config_path=config_path)
+    """Checks the config, file paths, and required source columns without processing data."""
+    errors = validate_config(config_path=config_path)
+    for error in errors:
+        logger.error(error)
+    if errors:
+        raise Exit(code=1)
+    logger.info("Config is valid.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,403 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Callable, Optional
+
+import pandas as pd
+
+from data2redcap.config import get_participant_column
+from data2redcap.transform.transform import (
+    build_column_index,
+    group_data_source,
+    score_data_source,
+    translate_data_source,
+)
+from data2redcap.utils import (
+    _create_file_path,
+    create_final_df_list,
+    export_file,
+    file_backup,
+    format_redcap_export,
+    join_with_data_key,
+    load_config,
+    load_data_file,
+    long_format_from_df_list,
+    resolve_data_files,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _fingerprint(*parts) -> str:
+    """Creates a stable hash of JSON serializable parts.
+
+    Arguments:
+        parts: Values that a stage result depends on.
+
+    Returns:
+        str: Hex digest identifying the parts.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class Pipeline:
+    """In-process data2redcap pipeline with lazily evaluated, memoized stages.
+
+    Per data source stages are `load`, `translate`, `score` and `group`. The
+    combined stages are `union`, `join` and `format` (or `long_format`), and
+    `export` writes the result. Each stage result is cached under a fingerprint of its upstream
+    fingerprint and the part of the configuration it uses, so changing one
+    source's config (or its files on disk) only recomputes the stages
+    downstream of that change.
+
+    Stage results are returned as cached; callers that modify them should
+    work on a copy.
+
+    Arguments:
+        process_config: Dictionary containing configuration for overall data processing.
+        source_config: Dictionary containing configuration for all individual data sources.
+        participants: Optional list of participant ids to restrict processing to.
+        reference: Use the row by row reference scoring and grouping implementations.
+    """
+
+    def __init__(
+        self,
+        process_config: dict,
+        source_config: dict,
+        participants: Optional[list[str]] = None,
+        reference: bool = False,
+    ) -> None:
+        self.process_config = process_config
+        self.source_config = source_config
+        self.participants = participants
+        self.reference = reference
+        self._cache = {}
+
+    @classmethod
+    def from_config(
+        cls,
+        config_path: str,
+        participants: Optional[list[str]] = None,
+        reference: bool = False,
+    ) -> "Pipeline":
+        """Creates a pipeline from a configuration file.
+
+        Arguments:
+            config_path: String path to configuration file.
+            participants: Optional list of participant ids to restrict processing to.
+            reference: Use the row by row reference scoring and grouping implementations.
+
+        Returns:
+            Pipeline: Pipeline for the configuration.
+        """
+        process_config, source_config = load_config(config_path=config_path)
+        return cls(
+            process_config,
+            source_config,
+            participants=participants,
+            reference=reference,
+        )
+
+    @property
+    def file_structure(self) -> dict:
+        return self.process_config["file_structure"]
+
+    @property
+    def data_sources(self) -> list[str]:
+        """Names of the data sources that have files to process."""
+        return [
+            data_source
+            for data_source, config in self.source_config.items()
+            if config["file_name"]
+        ]
+
+    def update_source(self, data_source: str, config: dict) -> None:
+        """Replaces the configuration of a single data source.
+
+        Only the stages that depend on this source are recomputed on next use.
+
+        Arguments:
+            data_source: Name of the data source.
+            config: New configuration for the data source.
+        """
+        self.source_config[data_source] = config
+
+    def clear_cache(self) -> None:
+        """Drops all cached stage results."""
+        self._cache.clear()
+
+    def _cached(
+        self, stage: str, name: str, key: str, compute: Callable[[], object]
+    ) -> object:
+        """Returns the cached result for a stage, computing it if its key changed.
+
+        Arguments:
+            stage: Name of the stage.
+            name: Name of the data source, or "all" for combined stages.
+            key: Fingerprint of everything the stage result depends on.
+            compute: Function producing the stage result.
+
+        Returns:
+            object: Stage result.
+        """
+        cached = self._cache.get((stage, name))
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        logger.info(f"Running {stage} stage for {name}")
+        result = compute()
+        self._cache[(stage, name)] = (key, result)
+        return result
+
+    # per data source stages
+
+    def _files(self, data_source: str) -> list[str]:
+        return resolve_data_files(
+            self.source_config[data_source]["file_name"], self.file_structure
+        )
+
+    def _load_key(self, data_source: str) -> str:
+        config = self.source_config[data_source]
+        file_stats = []
+        for file_name in self._files(data_source):
+            file_path = _create_file_path(
+                self.file_structure["file_parent_folder_path"],
+                self.file_structure["data_sources_folder"],
+                file_name,
+            )
+            stat = os.stat(file_path) if os.path.exists(file_path) else None
+            file_stats.append(
+                (file_name, stat and stat.st_mtime_ns, stat and stat.st_size)
+            )
+        return _fingerprint(
+            file_stats,
+            config["type"],
+            config.get("deduplicate_on"),
+            get_participant_column(config),
+            self.participants,
+            self.file_structure,
+        )
+
+    def load(self, data_source: str) -> pd.DataFrame:
+        """Loads the data file(s) of a data source."""
+        config = self.source_config[data_source]
+        return self._cached(
+            "load",
+            data_source,
+            self._load_key(data_source),
+            lambda: load_data_file(
+                self._files(data_source),
+                self.file_structure,
+                config["type"],
+                deduplicate_on=config.get("deduplicate_on"),
+                participants=self.participants,
+                participant_column=get_participant_column(config),
+            ),
+        )
+
+    def _translate_key(self, data_source: str) -> str:
+        config = self.source_config[data_source]
+        return _fingerprint(
+            self._load_key(data_source),
+            config.get("clean"),
+            config["config"].get("data_dictionary"),
+            config["config"].get("looping_questions"),
+            # whether the translate stage builds a column index
+            self.reference,
+            bool(
+                config["config"].get("survey_scoring")
+                or config["config"].get("grouping")
+            ),
+        )
+
+    def _translated(self, data_source: str) -> tuple:
+        """Translated data frame and the index of its columns, if one is needed."""
+        config = self.source_config[data_source]
+
+        def compute():
+            translated_df = translate_data_source(config, self.load(data_source).copy())
+            column_index = build_column_index(
+                config, translated_df, reference=self.reference
+            )
+            return translated_df, column_index
+
+        return self._cached(
+            "translate", data_source, self._translate_key(data_source), compute
+        )
+
+    def translate(self, data_source: str) -> pd.DataFrame:
+        """Translates a data source's headers to redcap headers."""
+        return self._translated(data_source)[0]
+
+    def _score_key(self, data_source: str) -> str:
+        config = self.source_config[data_source]
+        return _fingerprint(
+            self._translate_key(data_source),
+            config["config"].get("survey_scoring"),
+            self.reference,
+        )
+
+    def _scored(self, data_source: str) -> tuple:
+        """Scored data frame and the index of its columns, if one is needed."""
+        config = self.source_config[data_source]
+
+        def compute():
+            translated_df, column_index = self._translated(data_source)
+            # scoring adds columns to the index, so work on a copy of the cached one
+            column_index = None if column_index is None else column_index.copy()
+            scored_df = score_data_source(
+                config,
+                translated_df.copy(),
+                reference=self.reference,
+                column_index=column_index,
+            )
+            return scored_df, column_index
+
+        return self._cached("score", data_source, self._score_key(data_source), compute)
+
+    def score(self, data_source: str) -> pd.DataFrame:
+        """Scores a data source's surveys."""
+        return self._scored(data_source)[0]
+
+    def _group_key(self, data_source: str) -> str:
+        config = self.source_config[data_source]
+        return _fingerprint(
+            self._score_key(data_source),
+            config["config"].get("grouping"),
+            config["config"].get("drop_cols"),
+        )
+
+    def group(self, data_source: str) -> pd.DataFrame:
+        """Adds grouping/status columns and drops unneeded columns of a data source."""
+        config = self.source_config[data_source]
+
+        def compute():
+            scored_df, column_index = self._scored(data_source)
+            return group_data_source(
+                config,
+                scored_df.copy(),
+                reference=self.reference,
+                column_index=None if column_index is None else column_index.copy(),
+            )
+
+        return self._cached("group", data_source, self._group_key(data_source), compute)
+
+    def transform_all(self) -> dict:
+        """Transforms all data sources.
+
+        Returns:
+            df_dict: Dictionary of transformed data source data frames.
+        """
+        return {
+            data_source: self.group(data_source) for data_source in self.data_sources
+        }
+
+    # combined stages
+
+    def _union_key(self) -> str:
+        return _fingerprint(
+            [
+                (
+                    data_source,
+                    self._group_key(data_source),
+                    self.source_config[data_source].get("union"),
+                )
+                for data_source in self.data_sources
+            ],
+            self.process_config.get("union"),
+        )
+
+    def union(self) -> list[pd.DataFrame]:
+        """Combines transformed data sources into the final list of data frames."""
+        return self._cached(
+            "union",
+            "all",
+            self._union_key(),
+            lambda: create_final_df_list(
+                df_dict=self.transform_all(),
+                source_config=self.source_config,
+                union_config=self.process_config.get("union"),
+            ),
+        )
+
+    def _join_key(self) -> str:
+        data_key_path = self.file_structure["data_key_path"]
+        stat = os.stat(data_key_path) if os.path.exists(data_key_path) else None
+        return _fingerprint(
+            self._union_key(),
+            data_key_path,
+            stat and stat.st_mtime_ns,
+            self.participants,
+        )
+
+    def join(self) -> pd.DataFrame:
+        """Joins all data sources on the data key."""
+        return self._cached(
+            "join",
+            "all",
+            self._join_key(),
+            lambda: join_with_data_key(
+                self.file_structure["data_key_path"],
+                [df.copy() for df in self.union()],
+                participants=self.participants,
+            ),
+        )
+
+    def format(self) -> pd.DataFrame:
+        """Creates the final (transposed) redcap data frame."""
+
+        return self._cached(
+            "format",
+            "all",
+            self._join_key(),
+            lambda: format_redcap_export(self.join().copy()),
+        )
+
+    def long_format(self) -> pd.DataFrame:
+        """Creates the final redcap data frame in long (record, field_name, value) format."""
+        return self._cached(
+            "long_format",
+            "all",
+            _fingerprint(self._join_key(), self.process_config.get("record_id_field")),
+            lambda: long_format_from_df_list(
+                self.union(), self.process_config, participants=self.participants
+            ),
+        )
+
+    def export(
+        self,
+        backup: bool = False,
+        preview: Optional[bool] = None,
+        long_format: bool = False,
+    ) -> None:
+        """Exports the final redcap data frame.
+
+        Arguments:
+            backup: Whether to move the processed data files to the backup folder.
+            preview: Whether to export to the preview location. Defaults to True
+                when the pipeline is restricted to a list of participants.
+            long_format: Whether to export (record, field_name, value) rows
+                instead of the transposed layout.
+        """
+        if preview is None:
+            preview = self.participants is not None
+        export_df = self.long_format() if long_format else self.format()
+        export_file(
+            export_df, self.file_structure, preview=preview, long_format=long_format
+        )
+        if backup:
+            for data_source in self.data_sources:
+                file_backup(self._files(data_source), self.file_structure)
+
+    def run(self, backup: bool = False) -> pd.DataFrame:
+        """Runs every stage and exports the result.
+
+        Arguments:
+            backup: Whether to move the processed data files to the backup folder.
+
+        Returns:
+            export_df: Final redcap data frame.
+        """
+        self.export(backup=backup)
+        return self.format()
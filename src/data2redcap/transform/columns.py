@@ -0,0 +1,148 @@
+import bisect
+import fnmatch
+import functools
+import os
+import re
+from typing import Iterable, Optional, Pattern
+
+import numpy as np
+import pandas as pd
+
+_WILDCARDS = re.compile(r"[*?\[]")
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_pattern(pattern: str) -> Pattern:
+    """Compiles an fnmatch pattern the way `fnmatch.filter` does.
+
+    Arguments:
+        pattern: fnmatch pattern, e.g. "qq_covid_?_test_results".
+
+    Returns:
+        Pattern: Compiled regular expression.
+    """
+    return re.compile(fnmatch.translate(os.path.normcase(pattern)))
+
+
+class ColumnIndex:
+    """Index of a data frame's columns for prefix and fnmatch pattern lookups.
+
+    Column names are kept sorted so a pattern only scans the names sharing its
+    literal prefix, found by bisection, instead of the full column list.
+    Results are returned in frame order, exactly as `fnmatch.filter` would.
+    Labels that are not strings (e.g. numeric xlsx headers) are matched by
+    their string form. The index is built once per data frame and kept up to
+    date with `sync` as derived columns are appended.
+
+    Arguments:
+        columns: Column names in frame order.
+    """
+
+    def __init__(self, columns: Iterable[str]) -> None:
+        self._columns = []
+        self._positions = {}
+        self._sorted = []
+        for column in columns:
+            self._append(column)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def _append(self, column: str) -> None:
+        position = len(self._columns)
+        self._columns.append(column)
+        self._positions[column] = position
+        bisect.insort(self._sorted, (os.path.normcase(str(column)), position))
+
+    def copy(self) -> "ColumnIndex":
+        """Copies the index, e.g. before a copy of its data frame gains columns.
+
+        Returns:
+            ColumnIndex: Independent copy of the index.
+        """
+        column_index = ColumnIndex([])
+        column_index._columns = list(self._columns)
+        column_index._positions = dict(self._positions)
+        column_index._sorted = list(self._sorted)
+        return column_index
+
+    def sync(self, columns: Iterable[str]) -> None:
+        """Adds columns appended to the data frame since the index was built.
+
+        Rebuilds the index if existing columns were removed or reordered.
+
+        Arguments:
+            columns: Current column names in frame order.
+        """
+        columns = list(columns)
+        known = len(self._columns)
+        if len(columns) >= known and (
+            known == 0 or columns[known - 1] == self._columns[-1]
+        ):
+            for column in columns[known:]:
+                self._append(column)
+        else:
+            self.__init__(columns)
+
+    def match(self, pattern: str) -> list[str]:
+        """Finds the columns matching an fnmatch pattern.
+
+        Arguments:
+            pattern: fnmatch pattern, e.g. "qq_pss*".
+
+        Returns:
+            list[str]: Matching columns in frame order.
+        """
+        pattern = os.path.normcase(pattern)
+        literal_prefix = _WILDCARDS.split(pattern, maxsplit=1)[0]
+        regex = _compile_pattern(pattern)
+        start = bisect.bisect_left(self._sorted, (literal_prefix,))
+        positions = []
+        for name, position in self._sorted[start:]:
+            if not name.startswith(literal_prefix):
+                break
+            if regex.match(name):
+                positions.append(position)
+        return [self._columns[position] for position in sorted(positions)]
+
+    def positions(self, columns: list[str]) -> np.ndarray:
+        """Finds the positions of columns in the data frame.
+
+        Arguments:
+            columns: Column names.
+
+        Returns:
+            np.ndarray: Column positions.
+        """
+        return np.array([self._positions[column] for column in columns], dtype=int)
+
+    def block(self, columns: list[str]) -> Optional[slice]:
+        """Finds the positional slice covering columns that are adjacent and in order.
+
+        Arguments:
+            columns: Column names.
+
+        Returns:
+            slice: Positional slice, or None if the columns are not one contiguous block.
+        """
+        if not columns:
+            return None
+        positions = self.positions(columns)
+        if (np.diff(positions) != 1).any():
+            return None
+        return slice(positions[0], positions[-1] + 1)
+
+    def values(self, df: pd.DataFrame, columns: list[str]) -> np.ndarray:
+        """Extracts the values of columns, without copying when they form one block.
+
+        Arguments:
+            df: Data frame the index was built for.
+            columns: Column names.
+
+        Returns:
+            np.ndarray: Values (rows x columns).
+        """
+        block = self.block(columns)
+        if block is None:
+            return df[columns].to_numpy()
+        return df.iloc[:, block].to_numpy()
@@ -0,0 +1,43 @@
+import functools
+import logging
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceFallback(Exception):
+    """Raised by a vectorized function for input it cannot reproduce the
+    row by row result for exactly."""
+
+
+def falls_back_to(reference: Callable) -> Callable:
+    """Runs the row by row `reference` implementation when the decorated
+    vectorized function raises `ReferenceFallback`.
+
+    Vectorized functions raise `ReferenceFallback` before assigning any
+    column, so the reference sees the data frame unchanged. Any other
+    exception propagates. The undecorated function stays available as
+    `__wrapped__`.
+
+    Arguments:
+        reference: Row by row implementation, called without `column_index`.
+
+    Returns:
+        Callable: Decorator.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, column_index=None, **kwargs):
+            try:
+                return func(*args, column_index=column_index, **kwargs)
+            except ReferenceFallback as fallback:
+                logger.debug(
+                    f"{func.__name__} fell back to {reference.__name__}: {fallback}"
+                )
+                return reference(*args, **kwargs)
+
+        wrapper.reference = reference
+        return wrapper
+
+    return decorator
@@ -1,9 +1,13 @@
 import logging
 
 import fnmatch
+from typing import Optional
 
+import numpy as np
 import pandas as pd
 
+from data2redcap.transform.columns import ColumnIndex
+from data2redcap.transform.fallback import falls_back_to
 
 logger = logging.getLogger(__name__)
 
@@ -154,12 +158,20 @@ def _set_tbi_symptom_status(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def set_status_and_group(df: pd.DataFrame, grouping: bool) -> pd.DataFrame:
+def set_status_and_group(
+    df: pd.DataFrame,
+    grouping: bool,
+    reference: bool = False,
+    column_index: Optional[ColumnIndex] = None,
+) -> pd.DataFrame:
     """Adds grouping and status columns to data frame. If grouping is not necessary, returns unchanged df.
 
     Arguments:
         df: Data source data frame.
         grouping: Boolean indicating if grouping is necessary.
+        reference: Use the row by row reference implementations instead of the vectorized ones.
+        column_index: Optional index of the data frame's columns, shared with survey scoring.
+            Built from the data frame if not given.
 
     Returns:
         df: Data frame with grouping and status columns.
@@ -167,11 +179,139 @@ def set_status_and_group(df: pd.DataFrame, grouping: bool) -> pd.DataFrame:
     if not grouping:
         logger.info("No grouping variables provided in data source config")
         return df
-    tbi_status_df = _set_tbi_status(df=df)
-    covid_status_df = _set_covid_status(df=tbi_status_df)
-    suspected_covid_df = _set_suspected_covid19_status(df=covid_status_df)
-    grouped_df = _set_study_group(df=suspected_covid_df)
-    covid_symptom_df = _set_covid_symptom_status(df=grouped_df)
-    final_df = _set_tbi_symptom_status(df=covid_symptom_df)
+    if reference:
+        for step in [
+            _set_tbi_status,
+            _set_covid_status,
+            _set_suspected_covid19_status,
+            _set_study_group,
+            _set_covid_symptom_status,
+            _set_tbi_symptom_status,
+        ]:
+            df = step(df=df)
+    else:
+        if column_index is None:
+            column_index = ColumnIndex(df.columns)
+        for step in [
+            _set_tbi_status_vectorized,
+            _set_covid_status_vectorized,
+            _set_suspected_covid19_status_vectorized,
+            _set_study_group_vectorized,
+            _set_covid_symptom_status_vectorized,
+            _set_tbi_symptom_status_vectorized,
+        ]:
+            df = step(df=df, column_index=column_index)
+            # pick up the status column that was just added
+            column_index.sync(df.columns)
     logger.info("Grouping logic successfully applied to data source")
-    return final_df
+    return df
+
+
+def _matches_any(df: pd.DataFrame, header_list: list, values: list) -> np.ndarray:
+    """Flags the rows where any of the given columns holds one of the values.
+
+    Arguments:
+        df: Data frame.
+        header_list: List of column headers to check.
+        values: Values to look for.
+
+    Returns:
+        np.ndarray: Boolean array with one value per row.
+    """
+    found = np.zeros(len(df), dtype=bool)
+    for header in header_list:
+        found |= df[header].isin(values).to_numpy()
+    return found
+
+
+def _symptom_status(df: pd.DataFrame, header_list: list) -> list:
+    """Vectorized symptom status shared by covid-19 and tbi symptom columns.
+
+    Arguments:
+        df: Data frame with symptom duration columns.
+        header_list: List of symptom duration column headers.
+
+    Returns:
+        list: Symptom status code per row.
+    """
+    chronic = _matches_any(df, header_list, ["4", "5", "6"])
+    acute = _matches_any(df, header_list, ["1", "2", "3"])
+    return np.where(chronic, "2", np.where(acute, "3", "1")).tolist()
+
+
+@falls_back_to(_set_tbi_status)
+def _set_tbi_status_vectorized(
+    df: pd.DataFrame, column_index: Optional[ColumnIndex] = None
+) -> pd.DataFrame:
+    """Vectorized `_set_tbi_status`."""
+    tbi_history = df["qq_tbi_history___10"].isin(["1"]).to_numpy()
+    df["qq_mtbi_status"] = np.where(tbi_history, "1", "2").tolist()
+    return df
+
+
+@falls_back_to(_set_covid_status)
+def _set_covid_status_vectorized(
+    df: pd.DataFrame, column_index: Optional[ColumnIndex] = None
+) -> pd.DataFrame:
+    """Vectorized `_set_covid_status`."""
+    if column_index is None:
+        column_index = ColumnIndex(df.columns)
+    covid_history_header_list = column_index.match(
+        "qq_covid_?_test_results"
+    ) + column_index.match("qq_covid_??_test_results")
+    covid_positive = _matches_any(df, covid_history_header_list, ["1"])
+    df["qq_covid19_status"] = np.where(covid_positive, "2", "1").tolist()
+    return df
+
+
+@falls_back_to(_set_suspected_covid19_status)
+def _set_suspected_covid19_status_vectorized(
+    df: pd.DataFrame, column_index: Optional[ColumnIndex] = None
+) -> pd.DataFrame:
+    """Vectorized `_set_suspected_covid19_status`."""
+    no_covid = df["qq_covid_number"].isin(["11"]).to_numpy()
+    df["qq_suspected_covid19"] = np.where(no_covid, "2", "1").tolist()
+    return df
+
+
+@falls_back_to(_set_study_group)
+def _set_study_group_vectorized(
+    df: pd.DataFrame, column_index: Optional[ColumnIndex] = None
+) -> pd.DataFrame:
+    """Vectorized `_set_study_group`."""
+    mtbi_positive = df["qq_mtbi_status"].isin(["2"]).to_numpy()
+    covid_positive = df["qq_covid19_status"].isin(["2"]).to_numpy()
+    df["qq_group"] = np.where(
+        mtbi_positive,
+        np.where(covid_positive, "1", "4"),
+        np.where(covid_positive, "3", "2"),
+    ).tolist()
+    return df
+
+
+@falls_back_to(_set_covid_symptom_status)
+def _set_covid_symptom_status_vectorized(
+    df: pd.DataFrame, column_index: Optional[ColumnIndex] = None
+) -> pd.DataFrame:
+    """Vectorized `_set_covid_symptom_status`."""
+    if column_index is None:
+        column_index = ColumnIndex(df.columns)
+    covid_symptom_header_list = column_index.match(
+        "qq_covid_?_duration_*"
+    ) + column_index.match("qq_covid_??_duration_*")
+    df["qq_covid19_symptom_status"] = _symptom_status(df, covid_symptom_header_list)
+    return df
+
+
+@falls_back_to(_set_tbi_symptom_status)
+def _set_tbi_symptom_status_vectorized(
+    df: pd.DataFrame, column_index: Optional[ColumnIndex] = None
+) -> pd.DataFrame:
+    """Vectorized `_set_tbi_symptom_status`."""
+    if column_index is None:
+        column_index = ColumnIndex(df.columns)
+    tbi_symptom_header_list = column_index.match(
+        "qq_tbi_?_duration_*"
+    ) + column_index.match("qq_tbi_??_duration_*")
+    df["qq_mtbi_symptom_status"] = _symptom_status(df, tbi_symptom_header_list)
+    return df
@@ -1,48 +1,116 @@
 import fnmatch
 import math
+from typing import Callable, Optional
+
 import pandas as pd
 import numpy as np
 
+from data2redcap.transform.columns import ColumnIndex
+from data2redcap.transform.fallback import ReferenceFallback, falls_back_to
+
+# EQ5D utility decrements per question and response level
+EQ5D_SCORING_DICT = {
+    "qq_eq5d_mobility": {
+        "1": 0,
+        "2": 0.096,
+        "3": 0.122,
+        "4": 0.237,
+        "5": 0.322,
+    },
+    "qq_eq5d_selfcare": {
+        "1": 0,
+        "2": 0.089,
+        "3": 0.107,
+        "4": 0.220,
+        "5": 0.261,
+    },
+    "qq_eq5d_usual_activities": {
+        "1": 0,
+        "2": 0.068,
+        "3": 0.101,
+        "4": 0.255,
+        "5": 0.255,
+    },
+    "qq_eq5d_pain_discomfort": {
+        "1": 0,
+        "2": 0.060,
+        "3": 0.098,
+        "4": 0.318,
+        "5": 0.414,
+    },
+    "qq_eq5d_anxiety_depression": {
+        "1": 0,
+        "2": 0.057,
+        "3": 0.123,
+        "4": 0.299,
+        "5": 0.321,
+    },
+}
+
 
 # TODO figure out how to change which args are passed to which scoring function
 def calculate_special_survey_scoring(
-    df: pd.DataFrame, survey_scoring: dict
+    df: pd.DataFrame,
+    survey_scoring: dict,
+    reference: bool = False,
+    column_index: Optional[ColumnIndex] = None,
 ) -> pd.DataFrame:
     """Calculates average, total, and category scores with special logic for surveys.
 
     Arguments:
         df: Data source data frame.
         survey_scoring: Dictionary of survey scoring configurations.
+        reference: Use the row by row reference implementations instead of the vectorized ones.
+        column_index: Optional index of the data frame's columns, shared with grouping.
+            Built from the data frame if not given.
 
     Returns:
         df: Data frame with calculated scores.
     """
-    scoring_method_dict = {
-        "normal": score_normal_survey,
-        "wai": score_wai_survey,
-        "eq5d": score_eq5d_survey,
-    }
+    if reference:
+        scoring_method_dict = {
+            "normal": score_normal_survey,
+            "wai": score_wai_survey,
+            "eq5d": score_eq5d_survey,
+        }
+    else:
+        scoring_method_dict = {
+            "normal": score_normal_survey_vectorized,
+            "wai": score_wai_survey_vectorized,
+            "eq5d": score_eq5d_survey_vectorized,
+        }
+        if column_index is None:
+            column_index = ColumnIndex(df.columns)
     for survey, score_config in survey_scoring.items():
         prefix = score_config["question_prefix"]
         method = score_config["scoring_method"]
         skip_questions = score_config.get("skip_questions")
-        survey_question_list = fnmatch.filter(list(df.columns), f"{prefix}*")
+        if reference:
+            survey_question_list = fnmatch.filter(list(df.columns), f"{prefix}*")
+        else:
+            survey_question_list = column_index.match(f"{prefix}*")
         if skip_questions:
+            skip_questions = set(skip_questions)
             survey_question_list = [
                 question
                 for question in survey_question_list
                 if question not in skip_questions
             ]
-        if method in scoring_method_dict:
-            df = scoring_method_dict[method](
-                survey=survey,
-                survey_question_list=survey_question_list,
-                prefix=prefix,
-                df=df,
-                survey_scoring=survey_scoring,
-            )
-        else:
+        if method not in scoring_method_dict:
             raise ValueError(f"Survey {survey} is not supported and cannot be scored.")
+        scoring_kwargs = {
+            "survey": survey,
+            "survey_question_list": survey_question_list,
+            "prefix": prefix,
+            "df": df,
+            "survey_scoring": survey_scoring,
+        }
+        if not reference:
+            scoring_kwargs["column_index"] = column_index
+        df = scoring_method_dict[method](**scoring_kwargs)
+        if not reference:
+            # pick up the score columns that were just added
+            column_index.sync(df.columns)
     return df
 
 
@@ -206,43 +274,7 @@ def score_eq5d_survey(
     Returns:
         d: final scored dataframe
     """
-    scoring_dict = {
-        "qq_eq5d_mobility": {
-            "1": 0,
-            "2": 0.096,
-            "3": 0.122,
-            "4": 0.237,
-            "5": 0.322,
-        },
-        "qq_eq5d_selfcare": {
-            "1": 0,
-            "2": 0.089,
-            "3": 0.107,
-            "4": 0.220,
-            "5": 0.261,
-        },
-        "qq_eq5d_usual_activities": {
-            "1": 0,
-            "2": 0.068,
-            "3": 0.101,
-            "4": 0.255,
-            "5": 0.255,
-        },
-        "qq_eq5d_pain_discomfort": {
-            "1": 0,
-            "2": 0.060,
-            "3": 0.098,
-            "4": 0.318,
-            "5": 0.414,
-        },
-        "qq_eq5d_anxiety_depression": {
-            "1": 0,
-            "2": 0.057,
-            "3": 0.123,
-            "4": 0.299,
-            "5": 0.321,
-        },
-    }
+    scoring_dict = EQ5D_SCORING_DICT
     index_score_list = []
     for _, row in df.iterrows():
         value_list = []
@@ -251,3 +283,294 @@ def score_eq5d_survey(
         index_score_list.append(1 - sum(value_list))
     df["qq_eq5d_index_score"] = index_score_list
     return df
+
+
+def _convert_cells(
+    values: np.ndarray, converter: Callable
+) -> tuple[np.ndarray, np.ndarray]:
+    """Applies `float` or `int` to every cell, calling it once per distinct value.
+
+    Arguments:
+        values: Array of cell values (rows x questions).
+        converter: `float` or `int`.
+
+    Returns:
+        tuple: Converted values as float64 and a mask of the cells the
+            converter raises on.
+    """
+    # keep the memory order of the values so a view is not copied
+    order = "F" if values.flags.f_contiguous and not values.flags.c_contiguous else "C"
+    flat = values.ravel(order=order)
+    codes, uniques = pd.factorize(flat)
+    converted = np.full(len(uniques), np.nan)
+    unique_failed = np.zeros(len(uniques), dtype=bool)
+    for position, value in enumerate(uniques):
+        try:
+            converted_value = converter(value)
+        except (TypeError, ValueError):
+            unique_failed[position] = True
+            continue
+        if converter is int and abs(converted_value) > 2**53:
+            raise ReferenceFallback("integer response not exactly representable")
+        converted[position] = converted_value
+    result = np.full(len(flat), np.nan)
+    failed = np.zeros(len(flat), dtype=bool)
+    found = codes >= 0
+    result[found] = converted[codes[found]]
+    failed[found] = unique_failed[codes[found]]
+    # only float NaN converts (to NaN); None, pd.NA, etc. raise row by row
+    failed[~found] = [
+        converter is not float or not isinstance(value, float) for value in flat[~found]
+    ]
+    return (
+        result.reshape(values.shape, order=order),
+        failed.reshape(values.shape, order=order),
+    )
+
+
+def _raise_conversion_error(
+    values: np.ndarray, failed: np.ndarray, converter: Callable
+) -> None:
+    """Raises the error the row by row loop hits first when converting values.
+
+    Arguments:
+        values: Array of cell values (rows x questions).
+        failed: Mask of the cells the converter raises on.
+        converter: `float` or `int`.
+    """
+    # argwhere lists cells row by row, in question order
+    row, column = np.argwhere(failed)[0]
+    converter(values[row, column])
+
+
+def _flatten_categories(
+    matches: np.ndarray, categories: list, blank: np.ndarray
+) -> list:
+    """Builds a category list the way the row by row loops append to it.
+
+    Arguments:
+        matches: Boolean array (rows x categories) of appended categories.
+        categories: Category labels in config order.
+        blank: Boolean array of rows that append "" instead.
+
+    Returns:
+        list: Category labels in row order, one per appended value.
+    """
+    labels = np.array([""] + list(categories), dtype=object)
+    appended = np.column_stack([blank, matches & ~blank[:, None]])
+    return labels[np.nonzero(appended)[1]].tolist()
+
+
+def _category_matches(totals: np.ndarray, category_config: dict) -> np.ndarray:
+    """Flags the categories whose limits contain each total.
+
+    Arguments:
+        totals: Array of total scores.
+        category_config: Dictionary of category to [lower, upper] limits.
+
+    Returns:
+        np.ndarray: Boolean array (rows x categories).
+    """
+    if not category_config:
+        return np.zeros((len(totals), 0), dtype=bool)
+    return np.column_stack(
+        [
+            (totals >= limits[0]) & (totals <= limits[1])
+            for limits in category_config.values()
+        ]
+    )
+
+
+@falls_back_to(score_normal_survey)
+def score_normal_survey_vectorized(
+    survey: str,
+    survey_question_list: list,
+    prefix: str,
+    df: pd.DataFrame,
+    survey_scoring: dict,
+    column_index: Optional[ColumnIndex] = None,
+) -> pd.DataFrame:
+    """Vectorized `score_normal_survey`, producing identical scores and categories."""
+    if column_index is None:
+        column_index = ColumnIndex(df.columns)
+    # survey questions are usually adjacent, so this is a view rather than a copy
+    responses = column_index.values(df, survey_question_list)
+    values, failed = _convert_cells(responses, float)
+    if failed.any():
+        _raise_conversion_error(responses, failed, float)
+    if len(df) and not survey_question_list:
+        raise ZeroDivisionError("division by zero")  # sum([]) / len([])
+    # add question by question so floating point sums match the row by row sum()
+    totals = np.zeros(len(df))
+    for column in values.T:
+        totals = totals + column
+    averages = totals / max(len(survey_question_list), 1)
+    category_config = survey_scoring[survey]["category"] if len(df) else {}
+    matches = _category_matches(totals, category_config)
+    # only the first matching category is appended
+    matches = matches & (np.cumsum(matches, axis=1) == 1)
+    blank = np.isnan(totals) & bool(category_config)
+    category_list = _flatten_categories(matches, list(category_config), blank)
+    df[f"{prefix}_average_score"] = averages.tolist()
+    df[f"{prefix}_total_score"] = totals.tolist()
+    # raises like the row by row assignment when a total matches no category
+    df[f"{prefix}_cat"] = category_list
+    return df
+
+
+def _wai_adjusted_response(
+    responses: np.ndarray, work_type: np.ndarray, halved: list, increased: list
+) -> tuple[np.ndarray, np.ndarray]:
+    """Applies the WAI work type weighting to a demand question.
+
+    Arguments:
+        responses: Integer responses to the question.
+        work_type: Integer work type per row.
+        halved: (work_type, responses) that are weighted by 0.5.
+        increased: (work_type, responses) that are weighted by 1.5.
+
+    Returns:
+        tuple: Weighted responses and a mask of rows that became floats.
+    """
+    halve = (work_type == halved[0]) & np.isin(responses, halved[1])
+    increase = (work_type == increased[0]) & np.isin(responses, increased[1])
+    weighted = np.where(
+        halve, responses * 0.5, np.where(increase, responses * 1.5, responses)
+    )
+    return weighted, halve | increase
+
+
+@falls_back_to(score_wai_survey)
+def score_wai_survey_vectorized(
+    survey: str,
+    survey_question_list: list,
+    prefix: str,
+    df: pd.DataFrame,
+    survey_scoring: dict,
+    column_index: Optional[ColumnIndex] = None,
+) -> pd.DataFrame:
+    """Vectorized `score_wai_survey`, producing identical scores and categories."""
+    item_7_scores = np.array([1, 1, 1, 1, 2, 2, 2, 3, 3, 3, 4, 4, 4])
+    survey_question_list = survey_question_list[1:]
+    row_count = len(df)
+    if column_index is None:
+        column_index = ColumnIndex(df.columns)
+    if row_count == 0:
+        missing = np.zeros(0, dtype=bool)
+        cells = np.zeros((0, len(survey_question_list) + 1), dtype=object)
+    else:
+        work_type_column = df["qq_wai_1"]
+        # the row by row check is an identity check, so only np.nan itself is missing
+        if work_type_column.dtype == object:
+            missing = np.array(
+                [value is np.nan for value in work_type_column], dtype=bool
+            )
+        else:
+            missing = np.zeros(row_count, dtype=bool)
+        cells = column_index.values(df, ["qq_wai_1"] + survey_question_list)
+        cells = cells[~missing]
+    present = ~missing
+    responses, failed = _convert_cells(cells, int)
+    work_type = responses[:, 0]
+    responses = responses[:, 1:]
+    item_7_total = np.zeros(len(responses))
+    for question in ["qq_wai_8", "qq_wai_9", "qq_wai_10"]:
+        if question in survey_question_list:
+            item_7_total = (
+                item_7_total + responses[:, survey_question_list.index(question)]
+            )
+    row_failed = failed.any(axis=1)
+    item_7_failed = ~row_failed & ((item_7_total < 0) | (item_7_total > 12))
+    if row_failed.any() or item_7_failed.any():
+        # raise what the row by row loop hits first
+        first_row = np.flatnonzero(row_failed | item_7_failed)[0]
+        if row_failed[first_row]:
+            _raise_conversion_error(
+                cells[first_row : first_row + 1], failed[first_row : first_row + 1], int
+            )
+        raise KeyError(int(item_7_total[first_row]))
+    terms = []
+    is_float = np.zeros(len(responses), dtype=bool)
+    if "qq_wai_3" in survey_question_list:  # physically demanding question
+        weighted, weighted_float = _wai_adjusted_response(
+            responses[:, survey_question_list.index("qq_wai_3")],
+            work_type,
+            halved=(1, [1, 2]),
+            increased=(2, [3, 4, 5]),
+        )
+        terms.append(weighted)
+        is_float |= weighted_float
+    if "qq_wai_4" in survey_question_list:  # psychologically demanding question
+        weighted, weighted_float = _wai_adjusted_response(
+            responses[:, survey_question_list.index("qq_wai_4")],
+            work_type,
+            halved=(2, [1, 2]),
+            increased=(1, [3, 4, 5]),
+        )
+        terms.append(weighted)
+        is_float |= weighted_float
+    terms.append(item_7_scores[item_7_total.astype(int)])
+    totals = np.zeros(len(responses))
+    for term in terms:
+        totals = totals + term
+    averages = totals / len(terms)
+    total_list = np.full(row_count, "", dtype=object)
+    average_list = np.full(row_count, "", dtype=object)
+    present_index = np.flatnonzero(present)
+    total_list[present_index[is_float]] = totals[is_float]
+    total_list[present_index[~is_float]] = totals[~is_float].astype(np.int64)
+    average_list[present] = averages
+    # categories are only looked up for scored rows
+    category_config = survey_scoring[survey]["category"] if present.any() else {}
+    # every matching category is appended, as in the row by row loop
+    full_totals = np.zeros(row_count)
+    full_totals[present] = totals
+    category_list = _flatten_categories(
+        _category_matches(full_totals, category_config),
+        list(category_config),
+        missing,
+    )
+    df[f"{prefix}_average_score"] = average_list.tolist()
+    df[f"{prefix}_total_score"] = total_list.tolist()
+    # raises like the row by row assignment when totals match no or several categories
+    df[f"{prefix}_cat"] = category_list
+    return df
+
+
+@falls_back_to(score_eq5d_survey)
+def score_eq5d_survey_vectorized(
+    survey: str,
+    survey_question_list: list,
+    prefix: str,
+    df: pd.DataFrame,
+    survey_scoring: dict,
+    column_index: Optional[ColumnIndex] = None,
+) -> pd.DataFrame:
+    """Vectorized `score_eq5d_survey`, producing identical index scores."""
+    questions = list(EQ5D_SCORING_DICT)
+    decrements = np.full((len(df), len(questions)), np.nan)
+    is_int = np.ones(len(df), dtype=bool)
+    for position, (question, scores) in enumerate(EQ5D_SCORING_DICT.items()):
+        if question not in df.columns:
+            continue  # every row fails on this question
+        decrements[:, position] = df[question].map(scores).to_numpy(dtype=np.float64)
+        int_responses = [
+            response for response, score in scores.items() if isinstance(score, int)
+        ]
+        is_int &= df[question].isin(int_responses).to_numpy()
+    failed = np.isnan(decrements)
+    if failed.any():
+        # raise the KeyError the row by row lookup hits first
+        row, position = np.argwhere(failed)[0]
+        question = questions[position]
+        if question not in df.columns:
+            raise KeyError(question)
+        EQ5D_SCORING_DICT[question][df[question].astype(object).iloc[row]]
+    totals = np.zeros(len(df))
+    for column in decrements.T:
+        totals = totals + column
+    index_scores = np.empty(len(df), dtype=object)
+    index_scores[is_int] = (1 - totals[is_int]).astype(np.int64)
+    index_scores[~is_int] = 1 - totals[~is_int]
+    df["qq_eq5d_index_score"] = index_scores.tolist()
+    return df
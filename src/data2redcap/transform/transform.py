@@ -1,25 +1,39 @@
 import logging
+from typing import Optional
 
 import pandas as pd
 
 from data2redcap.utils import (
+    resolve_data_files,
     load_data_file,
     file_backup,
     create_final_data_dictionary,
     load_redcap_headers,
 )
+from data2redcap.config import get_participant_column
+from data2redcap.transform.columns import ColumnIndex
 from data2redcap.transform.survey import calculate_special_survey_scoring
 from data2redcap.transform.grouping import set_status_and_group
 
 logger = logging.getLogger(__name__)
 
 
-def transform_all_data_sources(process_config: dict, source_config: dict) -> dict:
+def transform_all_data_sources(
+    process_config: dict,
+    source_config: dict,
+    participants: Optional[list[str]] = None,
+    reference: bool = False,
+) -> dict:
     """Transforms all data sources.
 
+    When `participants` is given the run is a preview: only those participants
+    are loaded and the source files are left in place.
+
     Arguments:
         process_config: Dictionary containing configuration for overall data processing.
         source_config: Dictionary containing configuration for all individual data sources.
+        participants: Optional list of participant ids to restrict processing to.
+        reference: Use the row by row reference scoring and grouping implementations.
 
     Returns:
         df_dict: Dictionary of transformed data source data frames.
@@ -30,42 +44,149 @@ def transform_all_data_sources(process_config: dict, source_config: dict) -> dic
         if not config["file_name"]:
             logger.info(f"No file path in config for {data_source}")
             continue
-        # load file and move to back up location
+        # resolve glob patterns/lists to the files that make up this source
+        file_names = resolve_data_files(
+            config["file_name"], process_config["file_structure"]
+        )
+        # load file(s) and move to back up location
         source_df = load_data_file(
-            config["file_name"], process_config["file_structure"], config["type"]
+            file_names,
+            process_config["file_structure"],
+            config["type"],
+            deduplicate_on=config.get("deduplicate_on"),
+            participants=participants,
+            participant_column=get_participant_column(config),
+        )
+        transformed_df = transform_data_source(
+            config=config, source_df=source_df, reference=reference
         )
-        transformed_df = transform_data_source(config=config, source_df=source_df)
         df_dict.update({data_source: transformed_df})
-        file_backup(config["file_name"], process_config["file_structure"])
+        if participants is None:
+            file_backup(file_names, process_config["file_structure"])
     return df_dict
 
 
-def transform_data_source(config: dict, source_df: pd.DataFrame) -> pd.DataFrame:
-    """Transforms data source data frame.
+def translate_data_source(config: dict, source_df: pd.DataFrame) -> pd.DataFrame:
+    """Translates data source headers to redcap headers.
 
     Arguments:
         config: Dictionary containing configuration for data source.
         source_df: Data source data frame.
 
     Returns:
-        transformed_df: Transformed data source data frame.
+        translated_df: Data frame with redcap headers.
     """
     if config.get("clean"):  # for data that does not need transformation
         return source_df
     # expand data_dict if need be
     data_dict = create_final_data_dictionary(config)
     # translate to redcap headers
-    translated_df = load_redcap_headers(source_df, data_dict)
-    # survey scoring
-    if config["config"].get("survey_scoring"):
-        translated_df = calculate_special_survey_scoring(
-            translated_df, config["config"]["survey_scoring"]
-        )
-        logger.info("surveys scored")
+    return load_redcap_headers(source_df, data_dict)
+
+
+def build_column_index(
+    config: dict, translated_df: pd.DataFrame, reference: bool = False
+) -> Optional[ColumnIndex]:
+    """Indexes translated headers once for the vectorized scoring and grouping lookups.
+
+    Arguments:
+        config: Dictionary containing configuration for data source.
+        translated_df: Data frame with redcap headers.
+        reference: Whether the row by row reference implementations are used.
+
+    Returns:
+        column_index: Index of the data frame's columns, or None if no
+            vectorized scoring or grouping step runs for this data source.
+    """
+    if reference or config.get("clean"):
+        return None
+    if not (config["config"].get("survey_scoring") or config["config"].get("grouping")):
+        return None
+    return ColumnIndex(translated_df.columns)
+
+
+def score_data_source(
+    config: dict,
+    translated_df: pd.DataFrame,
+    reference: bool = False,
+    column_index: Optional[ColumnIndex] = None,
+) -> pd.DataFrame:
+    """Scores data source surveys.
+
+    Arguments:
+        config: Dictionary containing configuration for data source.
+        translated_df: Data frame with redcap headers.
+        reference: Use the row by row reference scoring implementations.
+        column_index: Optional index of the data frame's columns, shared with grouping.
+
+    Returns:
+        scored_df: Data frame with survey score columns.
+    """
+    if config.get("clean") or not config["config"].get("survey_scoring"):
+        return translated_df
+    scored_df = calculate_special_survey_scoring(
+        translated_df,
+        config["config"]["survey_scoring"],
+        reference=reference,
+        column_index=column_index,
+    )
+    logger.info("surveys scored")
+    return scored_df
+
+
+def group_data_source(
+    config: dict,
+    scored_df: pd.DataFrame,
+    reference: bool = False,
+    column_index: Optional[ColumnIndex] = None,
+) -> pd.DataFrame:
+    """Adds grouping/status columns and drops not needed columns of a data source.
+
+    Arguments:
+        config: Dictionary containing configuration for data source.
+        scored_df: Data frame with survey score columns.
+        reference: Use the row by row reference grouping implementations.
+        column_index: Optional index of the data frame's columns, shared with survey scoring.
+
+    Returns:
+        grouped_df: Transformed data source data frame.
+    """
+    if config.get("clean"):
+        return scored_df
     # create grouping/status columns for year 1 q
-    grouped_df = set_status_and_group(translated_df, config["config"].get("grouping"))
+    grouped_df = set_status_and_group(
+        scored_df,
+        config["config"].get("grouping"),
+        reference=reference,
+        column_index=column_index,
+    )
     # drop not needed columns
     if config["config"].get("drop_cols"):
         grouped_df = grouped_df.drop(columns=config["config"].get("drop_cols"))
-    # append df to list
     return grouped_df
+
+
+def transform_data_source(
+    config: dict, source_df: pd.DataFrame, reference: bool = False
+) -> pd.DataFrame:
+    """Transforms data source data frame.
+
+    Arguments:
+        config: Dictionary containing configuration for data source.
+        source_df: Data source data frame.
+        reference: Use the row by row reference scoring and grouping implementations.
+
+    Returns:
+        transformed_df: Transformed data source data frame.
+    """
+    if config.get("clean"):  # for data that does not need transformation
+        return source_df
+    translated_df = translate_data_source(config, source_df)
+    # index the translated headers once for scoring and grouping lookups
+    column_index = build_column_index(config, translated_df, reference=reference)
+    scored_df = score_data_source(
+        config, translated_df, reference=reference, column_index=column_index
+    )
+    return group_data_source(
+        config, scored_df, reference=reference, column_index=column_index
+    )
@@ -1,89 +1,181 @@
+import numpy as np
 import pandas as pd
 import shutil
-import json
+import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Optional, Union
+
+from data2redcap.config import (  # noqa: F401
+    _create_file_path,
+    create_final_data_dictionary,
+    load_config,
+    resolve_data_files,
+)
 
 logger = logging.getLogger(__name__)
 
+# rows per chunk when csv files are filtered to participants while reading
+CSV_CHUNK_SIZE = 10_000
+
+
+def file_backup(file_name: Union[str, list[str]], file_structure: dict) -> None:
+    """Moves data file(s) to backup folder
 
-def load_config(config_path: str) -> tuple[dict, dict]:
-    """Loads config file into dictionaries.
+    Files in a subfolder of the data sources folder (e.g. "site_a/export.csv")
+    are moved to the same subfolder of the backup folder, which is created if needed.
 
     Arguments:
-        config_path: String path to configuration file.
+        file_name: Name or list of names of data files.
+        file_structure: Dictionary containing configuration for file locations.
+    """
+    file_names = [file_name] if isinstance(file_name, str) else file_name
+    for name in file_names:
+        file_path = _create_file_path(
+            file_structure["file_parent_folder_path"],
+            file_structure["data_sources_folder"],
+            name,
+        )
+        backup_path = _create_file_path(
+            file_structure["file_parent_folder_path"],
+            file_structure["data_backup_folder"],
+            name,
+        )
+        # files in subfolders of the data sources folder keep their subfolder
+        os.makedirs(os.path.dirname(backup_path), exist_ok=True)
+        shutil.move(file_path, backup_path)
+
+
+def _clean_qualtrics_data(df: pd.DataFrame) -> pd.DataFrame:
+    """Performs cleaning of qualtrics data.
+
+    Args:
+        df: Qualtrics data frame.
 
     Returns:
-        process_config: Dictionary containing configuration for overall data processing.
-        source_config: Dictionary containing configuration for all individual data sources.
+        clean_df: Cleaned qualtrics data frame.
     """
-    with open(config_path) as file:
-        config = json.load(file)
-    process_config = config["process_config"]
-    source_config = config["data_sources"]
-    return process_config, source_config
+    df = df.drop([0, 1]).reset_index()
+    clean_df = df[df["Progress"] == "100"]
+    return clean_df
 
 
-def _create_file_path(*args: list[str]) -> str:
-    """Combines all arguments into a single path string.
+def _normalize_ids(ids: pd.Series) -> pd.Series:
+    """Converts participant ids to stripped strings for comparison.
+
+    Float columns of whole numbers (numeric ids with missing values) are
+    compared without the trailing ".0" pandas would otherwise add.
 
     Arguments:
-        args: List of strings.
+        ids: Participant id column.
 
     Returns:
-        str: Path made of joined string arguments.
+        ids: Normalized participant ids.
     """
-    return "/".join(args)
+    if pd.api.types.is_float_dtype(ids) and (ids.dropna() % 1 == 0).all():
+        ids = ids.astype("Int64")
+    return ids.astype(str).str.strip()
 
 
-def file_backup(file_name: str, file_structure: dict) -> None:
-    """Moves data file to backup folder
+def _filter_participants(
+    df: pd.DataFrame, participants: list[str], participant_column: str
+) -> pd.DataFrame:
+    """Restricts a data frame to the rows of the given participants.
 
     Arguments:
-        file_name: Name of data file.
-        file_structure: Dictionary containing configuration for file locations.
+        df: Data frame.
+        participants: List of participant ids to keep.
+        participant_column: Name of the column holding participant ids.
+
+    Returns:
+        df: Data frame containing only the given participants.
     """
-    file_path = _create_file_path(
-        file_structure["file_parent_folder_path"],
-        file_structure["data_sources_folder"],
-        file_name,
-    )
-    backup_path = _create_file_path(
-        file_structure["file_parent_folder_path"],
-        file_structure["data_backup_folder"],
-        file_name,
-    )
-    shutil.move(file_path, backup_path)
+    if participant_column not in df.columns:
+        logger.warning(
+            f"Column `{participant_column}` not found, participant filter not applied"
+        )
+        return df
+    participants = [str(participant).strip() for participant in participants]
+    return df[_normalize_ids(df[participant_column]).isin(participants)]
 
 
-def _clean_qualtrics_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Performs cleaning of qualtrics data.
+def _filter_source_rows(
+    df: pd.DataFrame, file_type: str, participants: list[str], participant_column: str
+) -> pd.DataFrame:
+    """Restricts the rows read from a data file to the given participants.
 
-    Args:
-        df: Qualtrics data frame.
+    The two Qualtrics header rows (labels 0 and 1) are kept so the file can be
+    cleaned as usual.
+
+    Arguments:
+        df: Data frame read from a data file.
+        file_type: Type of data source.
+        participants: List of participant ids to keep.
+        participant_column: Name of the column holding participant ids.
 
     Returns:
-        clean_df: Cleaned qualtrics data frame.
+        df: Data frame containing only the given participants.
     """
-    df = df.drop([0, 1]).reset_index()
-    clean_df = df[df["Progress"] == "100"]
-    return clean_df
+    filtered = _filter_participants(df, participants, participant_column)
+    if file_type == "Qualtrics":
+        return df[df.index.isin([0, 1]) | df.index.isin(filtered.index)]
+    return filtered
 
 
-def load_data_file(
-    file_name: str, file_structure: dict, file_type: str
+def _read_csv_filtered(
+    file_path: str,
+    file_type: str,
+    participants: list[str],
+    participant_column: str,
+    **read_kwargs,
 ) -> pd.DataFrame:
-    """Loads data files into data frame for processing
+    """Reads a csv file in chunks, keeping only the rows of the given participants.
+
+    Arguments:
+        file_path: Path to csv file.
+        file_type: Type of data source.
+        participants: List of participant ids to keep.
+        participant_column: Name of the column holding participant ids.
+        read_kwargs: Additional arguments passed to `pd.read_csv`.
+
+    Returns:
+        df: Data frame containing only the given participants.
+    """
+    if file_type == "Qualtrics":
+        # header rows make every column text when the file is read whole
+        read_kwargs.setdefault("dtype", str)
+    chunks = []
+    with pd.read_csv(file_path, chunksize=CSV_CHUNK_SIZE, **read_kwargs) as reader:
+        for chunk in reader:
+            chunks.append(
+                _filter_source_rows(chunk, file_type, participants, participant_column)
+            )
+    return pd.concat(chunks)
+
+
+def _read_data_file(
+    file_name: str,
+    file_structure: dict,
+    file_type: str,
+    participants: Optional[list[str]] = None,
+    participant_column: str = "participant_id",
+) -> pd.DataFrame:
+    """Reads a single data file into a data frame.
+
+    With `participants`, csv files are read in chunks and filtered as they
+    are read; xlsx files are filtered once read.
 
     Arguments:
         file_name: Name of data file.
         file_structure: Dictionary containing configuration for file locations.
         file_type: Type of data source.
+        participants: Optional list of participant ids to keep.
+        participant_column: Name of the column holding participant ids.
 
     Returns:
         df: Data frame
     """
-
     file_path = _create_file_path(
         file_structure["file_parent_folder_path"],
         file_structure["data_sources_folder"],
@@ -93,61 +185,79 @@ def load_data_file(
     # TODO better file extension handling
     if file_name.endswith(".csv"):
         # TODO pull out into config
-        if "QY1" in file_name:
-            df = pd.read_csv(file_path, dtype=str)
+        read_kwargs = {"dtype": str} if "QY1" in file_name else {}
+        if participants is not None:
+            df = _read_csv_filtered(
+                file_path, file_type, participants, participant_column, **read_kwargs
+            )
         else:
-            df = pd.read_csv(file_path)
+            df = pd.read_csv(file_path, **read_kwargs)
 
     elif file_name.endswith(".xlsx"):
         df = pd.read_excel(file_path)
+        if participants is not None:
+            df = _filter_source_rows(df, file_type, participants, participant_column)
     else:
         raise ImportError("File type not supported. Must be either `.csv` or `.xlsx`")
     if file_type == "Qualtrics":
         df = _clean_qualtrics_data(df)
-    logger.info(f"{file_name} loaded")
+    if participants is not None and df.empty:
+        logger.warning(f"No rows of the selected participants found in {file_name}")
     return df
 
 
-def create_final_data_dictionary(config: dict) -> dict:
-    """Generates final data dictionary with looping questions.
+def load_data_file(
+    file_name: Union[str, list[str]],
+    file_structure: dict,
+    file_type: str,
+    deduplicate_on: Optional[str] = None,
+    participants: Optional[list[str]] = None,
+    participant_column: str = "participant_id",
+) -> pd.DataFrame:
+    """Loads data files into data frame for processing
+
+    Multiple files are read concurrently and concatenated once. The names of
+    the files that contributed are recorded in `df.attrs["source_files"]`.
 
     Arguments:
-        config: Dictionary containing configuration for data sources.
+        file_name: Name or list of names of data files.
+        file_structure: Dictionary containing configuration for file locations.
+        file_type: Type of data source.
+        deduplicate_on: Optional column (e.g. response ID) used to drop duplicate rows.
+            The row from the last file read is kept.
+        participants: Optional list of participant ids. Each file is filtered to
+            these participants as soon as it is read.
+        participant_column: Name of the column holding participant ids in the raw file.
 
     Returns:
-        data_dict: Final data dictionary for data sources.
+        df: Data frame
     """
-    data_dict = config["config"].get("data_dictionary")
-    if data_dict is None:
-        logger.info("No data dictionary provided in data source config")
-        return data_dict
-    if (
-        config["config"].get("looping_questions") is None
-        or len(config["config"].get("looping_questions")) == 0
-    ):
-        logger.info("No looping questions present in data source config")
-        return data_dict
+    file_names = [file_name] if isinstance(file_name, str) else list(file_name)
+    read_kwargs = {
+        "file_structure": file_structure,
+        "file_type": file_type,
+        "participants": participants,
+        "participant_column": participant_column,
+    }
+    if len(file_names) == 1:
+        df = _read_data_file(file_names[0], **read_kwargs)
     else:
-        looping_dict = config["config"].get("looping_questions")
-        new_dict = {}
-        for prefix, number in looping_dict.items():
-            for k, v in data_dict.items():
-                if k.startswith("1_") and (
-                    "vaccine" not in v and "vaccination" not in v
-                ):
-                    new_dict.update({k: v})
-                    if v.startswith(prefix):
-                        for i in range(number):
-                            if i != 0:
-                                key = str(i + 1) + "_" + k.split("_", 1)[1]
-                                value = (
-                                    v.split("1", 1)[0] + str(i + 1) + v.split("1", 1)[1]
-                                )
-                                new_dict.update({key: value})
-                else:
-                    new_dict.update({k: v})
-        logger.info("data dictionary successfully expanded for looping questions")
-        return new_dict
+        with ThreadPoolExecutor() as executor:
+            df_list = list(
+                executor.map(
+                    lambda name: _read_data_file(name, **read_kwargs), file_names
+                )
+            )
+        df = pd.concat(df_list, ignore_index=True)
+    if deduplicate_on:
+        row_count = len(df)
+        df = df.drop_duplicates(subset=deduplicate_on, keep="last")
+        logger.info(
+            f"{row_count - len(df)} duplicate rows dropped on `{deduplicate_on}`"
+        )
+    df.attrs["source_files"] = file_names
+    logger.info(f"{', '.join(file_names)} loaded")
+    return df
 
 
 def load_redcap_headers(df: pd.DataFrame, data_dict: dict) -> pd.DataFrame:
@@ -171,17 +281,55 @@ def load_redcap_headers(df: pd.DataFrame, data_dict: dict) -> pd.DataFrame:
     return df_final
 
 
-def join_with_data_key(data_key_path: str, df_list: list[pd.DataFrame]) -> pd.DataFrame:
+def load_data_key(
+    data_key_path: str, participants: Optional[list[str]] = None
+) -> pd.DataFrame:
+    """Loads data key into data frame.
+
+    Arguments:
+        data_key_path: Path to data key.
+        participants: Optional list of participant ids to restrict the data key to.
+
+    Returns:
+        data_key_df: Data key data frame.
+    """
+    data_key_df = pd.read_excel(data_key_path)
+    if participants is not None:
+        data_key_df = _filter_participants(data_key_df, participants, "participant_id")
+    return data_key_df
+
+
+def sample_participants(data_key_path: str, sample_size: int) -> list[str]:
+    """Selects the first participants from the data key for a preview run.
+
+    Arguments:
+        data_key_path: Path to data key.
+        sample_size: Number of participants to select.
+
+    Returns:
+        participants: List of participant ids.
+    """
+    data_key_df = load_data_key(data_key_path)
+    participants = _normalize_ids(data_key_df["participant_id"])
+    return participants.head(sample_size).tolist()
+
+
+def join_with_data_key(
+    data_key_path: str,
+    df_list: list[pd.DataFrame],
+    participants: Optional[list[str]] = None,
+) -> pd.DataFrame:
     """Joins all data sources on data key.
 
     Arguments:
         data_key_path: Path to data key.
         df_list: List of data source data frames.
+        participants: Optional list of participant ids to restrict the data key to.
 
     Returns:
         data_key_df: Data frame with all data sources merged with data key.
     """
-    data_key_df = pd.read_excel(data_key_path)
+    data_key_df = load_data_key(data_key_path, participants=participants)
     for df in df_list:
         # strip trailing and leading spaces from participant_id
         df["participant_id"] = df["participant_id"].str.strip()
@@ -190,23 +338,48 @@ def join_with_data_key(data_key_path: str, df_list: list[pd.DataFrame]) -> pd.Da
     return data_key_df
 
 
-def create_final_redcap_format(df_dict: dict, process_config: dict) -> pd.DataFrame:
+def create_final_redcap_format(
+    df_dict: dict,
+    process_config: dict,
+    participants: Optional[list[str]] = None,
+    source_config: Optional[dict] = None,
+) -> pd.DataFrame:
     """Creates final redcap data frame.
 
     Arguments:
         df_dict: Dictionary of data source data frames.
         process_config: Dictionary containing configuration for overall data processing.
+        participants: Optional list of participant ids to restrict the export to.
+        source_config: Dictionary containing configuration for all individual data sources.
 
     Returns:
         export_df: Final redcap data frame.
     """
     # create final list of dataframe to merge
-    final_df_list = create_final_df_list(df_dict=df_dict)
+    final_df_list = create_final_df_list(
+        df_dict=df_dict,
+        source_config=source_config,
+        union_config=process_config.get("union"),
+    )
     # join dfs
     wide_joined_df = join_with_data_key(
-        process_config["file_structure"]["data_key_path"], final_df_list
+        process_config["file_structure"]["data_key_path"],
+        final_df_list,
+        participants=participants,
     )
     logger.info("All data sources successfully merged with data key")
+    return format_redcap_export(wide_joined_df)
+
+
+def format_redcap_export(wide_joined_df: pd.DataFrame) -> pd.DataFrame:
+    """Transposes joined data frame into redcap import layout.
+
+    Arguments:
+        wide_joined_df: Data frame with all data sources merged with data key.
+
+    Returns:
+        export_df: Final redcap data frame.
+    """
     # add column where every value is "Record" in the first column slot
     wide_joined_df[" "] = "Record"
     # transpose with Record being at the to
@@ -214,46 +387,258 @@ def create_final_redcap_format(df_dict: dict, process_config: dict) -> pd.DataFr
     return export_df
 
 
-def create_final_df_list(df_dict: dict) -> list[pd.DataFrame]:
+def _long_format_rows(df: pd.DataFrame, records: np.ndarray) -> list[pd.DataFrame]:
+    """Creates (record, field_name, value) rows for every answered cell of a data frame.
+
+    Arguments:
+        df: Data frame with one row per record.
+        records: Record id for each row of the data frame.
+
+    Returns:
+        pieces: List of long format data frames, one per column with answers.
+    """
+    pieces = []
+    for column in df.columns:
+        values = df[column].to_numpy()
+        answered = pd.notna(values) & (values != "")
+        if answered.any():
+            pieces.append(
+                pd.DataFrame(
+                    {
+                        "record": records[answered],
+                        "field_name": column,
+                        "value": values[answered],
+                    }
+                )
+            )
+    return pieces
+
+
+def create_long_redcap_format(
+    df_dict: dict,
+    process_config: dict,
+    participants: Optional[list[str]] = None,
+    source_config: Optional[dict] = None,
+) -> pd.DataFrame:
+    """Creates final redcap data frame in long (record, field_name, value) format.
+
+    Arguments:
+        df_dict: Dictionary of data source data frames.
+        process_config: Dictionary containing configuration for overall data processing.
+        participants: Optional list of participant ids to restrict the export to.
+        source_config: Dictionary containing configuration for all individual data sources.
+
+    Returns:
+        export_df: Final redcap data frame in long format.
+    """
+    final_df_list = create_final_df_list(
+        df_dict=df_dict,
+        source_config=source_config,
+        union_config=process_config.get("union"),
+    )
+    return long_format_from_df_list(final_df_list, process_config, participants)
+
+
+def long_format_from_df_list(
+    final_df_list: list[pd.DataFrame],
+    process_config: dict,
+    participants: Optional[list[str]] = None,
+) -> pd.DataFrame:
+    """Creates long (record, field_name, value) rows from the final list of data frames.
+
+    Rows are built per data frame, so the dense joined data frame is never
+    created and unanswered fields are left out.
+
+    Arguments:
+        final_df_list: Final list of data frames.
+        process_config: Dictionary containing configuration for overall data processing.
+        participants: Optional list of participant ids to restrict the export to.
+
+    Returns:
+        export_df: Final redcap data frame in long format.
+    """
+    data_key_df = load_data_key(
+        process_config["file_structure"]["data_key_path"], participants=participants
+    )
+    # redcap identifies records by the first field unless configured otherwise
+    record_field = process_config.get("record_id_field", data_key_df.columns[0])
+    # compare ids as stripped strings, the data key is often read with numeric ids
+    key_ids = _normalize_ids(data_key_df["participant_id"])
+    has_id = data_key_df["participant_id"].notna().to_numpy()
+    unique_key = ~key_ids.duplicated().to_numpy() & has_id
+    key_records = data_key_df[record_field].to_numpy()
+    # look up positions rather than records so record ids keep their dtype
+    position_lookup = pd.Series(
+        np.flatnonzero(unique_key), index=key_ids[unique_key].to_numpy()
+    )
+    pieces = _long_format_rows(data_key_df, key_records)
+    for df in final_df_list:
+        positions = _normalize_ids(df["participant_id"]).map(position_lookup)
+        in_key = positions.notna().to_numpy()
+        unmatched = int((~in_key).sum())
+        if unmatched:
+            fields = ", ".join(map(str, df.columns.drop("participant_id")[:3]))
+            message = (
+                f"{unmatched} of {len(df)} rows with fields {fields}, ... "
+                "have no data key record and are left out"
+            )
+            if in_key.any():
+                logger.info(message)
+            else:
+                logger.warning(message)
+        pieces += _long_format_rows(
+            df.loc[in_key].drop(columns="participant_id"),
+            key_records[positions.to_numpy()[in_key].astype(int)],
+        )
+    if not pieces:
+        return pd.DataFrame(columns=["record", "field_name", "value"])
+    export_df = pd.concat(pieces, ignore_index=True)
+    logger.info(f"{len(export_df)} long format rows created")
+    return export_df
+
+
+def _get_union_bucket(data_source: str, source_config: Optional[dict]) -> Optional[str]:
+    """Finds the union bucket a data source belongs to.
+
+    Arguments:
+        data_source: Name of the data source.
+        source_config: Dictionary containing configuration for all individual data sources.
+
+    Returns:
+        str: Name of the union bucket, or None if the data source is not unioned.
+    """
+    if source_config is not None and source_config.get(data_source, {}).get("union"):
+        return source_config[data_source]["union"]
+    # sources without a union setting are routed by name
+    if "consent" in data_source:
+        return "consent"
+    elif "questionnaire" in data_source:
+        return "questionnaire"
+    return None
+
+
+def _keep_one_response(
+    df: pd.DataFrame, keep: str = "latest", order_by: Optional[str] = None
+) -> pd.DataFrame:
+    """Keeps the latest or most complete response per participant.
+
+    Responses are sorted once and duplicates dropped, keeping the last row per
+    participant. Later rows (or later `order_by` values) count as later responses.
+
+    Arguments:
+        df: Data frame with a participant_id column.
+        keep: "latest" or "most_complete". Ties in completeness keep the latest response.
+        order_by: Optional column giving the response order, e.g. a submission date.
+
+    Returns:
+        df: Data frame with one row per participant.
+    """
+    if keep not in ["latest", "most_complete"]:
+        raise ValueError(
+            f"Union keep must be `latest` or `most_complete`, not `{keep}`"
+        )
+    sort_df = pd.DataFrame(
+        {
+            # strip trailing and leading spaces from participant_id
+            "participant_id": df["participant_id"].str.strip().to_numpy(),
+            "position": np.arange(len(df)),
+        }
+    )
+    sort_columns = ["participant_id"]
+    if keep == "most_complete":
+        sort_df["answered"] = (df.notna() & (df != "")).sum(axis=1).to_numpy()
+        sort_columns.append("answered")
+    if order_by:
+        sort_df["order_by"] = df[order_by].to_numpy()
+        sort_columns.append("order_by")
+    sort_columns.append("position")
+    kept = (
+        sort_df.sort_values(sort_columns, kind="mergesort", na_position="first")
+        .drop_duplicates("participant_id", keep="last")["position"]
+        .sort_values()
+        .to_numpy()
+    )
+    return df.iloc[kept]
+
+
+def create_final_df_list(
+    df_dict: dict,
+    source_config: Optional[dict] = None,
+    union_config: Optional[dict] = None,
+) -> list[pd.DataFrame]:
     """Creates final list of data frames before merging.
 
+    Data sources that share a `union` value in their config are concatenated
+    once and reduced to one response per participant, so the join with the
+    data key stays at one row per participant. Unioned data frames are
+    appended after the other data sources, consent and questionnaire first.
+
     Arguments:
         df_dict: Dictionary of data source data frames.
+        source_config: Dictionary containing configuration for all individual data sources.
+        union_config: Optional dictionary of union bucket to its settings, `keep`
+            ("latest" or "most_complete") and `order_by` (column giving the response order).
 
     Returns:
         final_df_list: Final list of data frames.
     """
-    consent_df_list = []
-    questionnaire_df_list = []
+    union_config = union_config or {}
+    # consent and questionnaire are always appended first and in this order,
+    # other buckets follow in the order they are first seen
+    union_df_lists = {"consent": [], "questionnaire": []}
     final_df_list = []
     for key, value in df_dict.items():
-        if "consent" in key:
-            consent_df_list.append(value)
-        elif "questionnaire" in key:
-            questionnaire_df_list.append(value)
-        else:
+        bucket = _get_union_bucket(key, source_config)
+        if bucket is None:
             final_df_list.append(value)
-    if consent_df_list:
-        consent_df = pd.concat(consent_df_list)
-        final_df_list.append(consent_df)
-    if questionnaire_df_list:
-        questionnaire_df = pd.concat(questionnaire_df_list)
-        final_df_list.append(questionnaire_df)
+        else:
+            union_df_lists.setdefault(bucket, []).append(value)
+    for bucket, df_list in union_df_lists.items():
+        if not df_list:
+            continue
+        union_df = pd.concat(df_list, ignore_index=True, sort=False)
+        bucket_config = union_config.get(bucket, {})
+        deduplicated_df = _keep_one_response(
+            union_df,
+            keep=bucket_config.get("keep", "latest"),
+            order_by=bucket_config.get("order_by"),
+        )
+        logger.info(
+            f"{bucket}: {len(df_list)} sources unioned, "
+            f"{len(union_df) - len(deduplicated_df)} duplicate responses collapsed"
+        )
+        final_df_list.append(deduplicated_df)
     return final_df_list
 
 
-def export_file(df: pd.DataFrame, file_structure: dict) -> None:
+def export_file(
+    df: pd.DataFrame,
+    file_structure: dict,
+    preview: bool = False,
+    long_format: bool = False,
+) -> None:
     """Exports data frame to csv file.
 
     Arguments:
         df: Data frame to export.
         file_structure: Dictionary containing configuration for file locations.
+        preview: Whether to export to the preview location instead of the final export location.
+        long_format: Whether the data frame is in long (record, field_name, value) format.
     """
     str_dt = datetime.today().strftime("%Y-%m-%d")
-    file_path = _create_file_path(
-        file_structure["file_parent_folder_path"],
-        file_structure["final_export_location"],
-        f"redcap_import_{str_dt}.csv",
-    )
-    df.to_csv(file_path)
+    suffix = f"long_{str_dt}" if long_format else str_dt
+    if preview:
+        export_folder = _create_file_path(
+            file_structure["file_parent_folder_path"],
+            file_structure.get("preview_export_location", "redcap_previews"),
+        )
+        os.makedirs(export_folder, exist_ok=True)
+        file_path = _create_file_path(export_folder, f"redcap_preview_{suffix}.csv")
+    else:
+        file_path = _create_file_path(
+            file_structure["file_parent_folder_path"],
+            file_structure["final_export_location"],
+            f"redcap_import_{suffix}.csv",
+        )
+    df.to_csv(file_path, index=not long_format)
     logger.info("Redcap import file successfully exported. Process complete.")